@@ -1,105 +1,1077 @@
+import os
+import functools
+import copy
+import time
+import importlib
 import pandas as pd
 import numpy as np
-from statsmodels.tsa.statespace.sarimax import SARIMAX
-from statsmodels.tsa.holtwinters import ExponentialSmoothing
-from prophet import Prophet
-from sklearn.ensemble import IsolationForest
-from sklearn.cluster import KMeans
+from model_cache import (get_or_fit, fingerprint_series, make_cache_key, model_cache, cache_refresh,
+                         refresh_requested)
+from instrumentation import observe_stage, span, MODEL_TIMEOUTS
+from workers import KillableWorkerPool, OK, TIMEOUT
+from online_anomaly import RobustZScoreDetector, HalfSpaceTrees
+from frequency import infer_frequency, default_season_length, freq_seconds
 
-def arima_forecast(data, steps_ahead):
+# Реестр бэкендов моделей: имя -> (модуль, класс). Тяжёлые библиотеки (Prophet, statsmodels, sklearn)
+# импортируются при первом использовании, а не при импорте ai_module
+MODEL_BACKENDS = {
+    'sarimax': ('statsmodels.tsa.statespace.sarimax', 'SARIMAX'),
+    'exponential_smoothing': ('statsmodels.tsa.holtwinters', 'ExponentialSmoothing'),
+    'prophet': ('prophet', 'Prophet'),
+    'isolation_forest': ('sklearn.ensemble', 'IsolationForest'),
+    'kmeans': ('sklearn.cluster', 'KMeans'),
+    'minibatch_kmeans': ('sklearn.cluster', 'MiniBatchKMeans'),
+    'silhouette_score': ('sklearn.metrics', 'silhouette_score'),
+}
+
+_loaded_backends = {}
+# Время импорта каждого бэкенда в секундах
+backend_import_seconds = {}
+
+
+def get_backend(name):
+    """
+    Возвращает класс модели из реестра MODEL_BACKENDS, импортируя его при первом вызове.
+
+    Args:
+        name (str): Имя бэкенда (например, 'sarimax').
+
+    Returns:
+        type: Класс модели.
+    """
+    backend = _loaded_backends.get(name)
+    if backend is None:
+        module_name, class_name = MODEL_BACKENDS[name]
+        start = time.perf_counter()
+        backend = getattr(importlib.import_module(module_name), class_name)
+        backend_import_seconds[name] = time.perf_counter() - start
+        _loaded_backends[name] = backend
+    return backend
+
+
+def warm_up(backends=None):
+    """
+    Заранее импортирует бэкенды моделей.
+
+    Вызывается рабочими процессами после fork, чтобы первый запрос не платил за импорт библиотек.
+
+    Args:
+        backends (list): Имена бэкендов (по умолчанию все из MODEL_BACKENDS).
+
+    Returns:
+        dict: Время импорта каждого бэкенда в секундах.
+    """
+    for name in backends or MODEL_BACKENDS:
+        try:
+            get_backend(name)
+        except Exception as e:
+            print(f"Ошибка при импорте бэкенда {name}: {str(e)}")
+    return dict(backend_import_seconds)
+
+# Параметры моделей по умолчанию (входят в ключ кэша обученных моделей); длина сезона 12
+# заменяется длиной сезона ряда, см. model_params
+SARIMA_PARAMS = {'order': (1, 1, 1), 'seasonal_order': (1, 1, 1, 12)}
+PROPHET_PARAMS = {'yearly_seasonality': True, 'weekly_seasonality': False, 'daily_seasonality': False}
+# Быстрый режим Prophet: без выборок для интервалов неопределённости, если интервалы не запрошены
+PROPHET_FAST_MODE = os.environ.get('TIMESEER_PROPHET_FAST', '1') == '1'
+HOLT_WINTERS_PARAMS = {'seasonal': 'add', 'seasonal_periods': 12}
+# Наибольшая длина сезона для сезонной SARIMA (при более длинном сезоне модель строится без сезонной части)
+SARIMA_MAX_SEASON_LENGTH = int(os.environ.get('TIMESEER_SARIMA_MAX_SEASON', 24))
+
+
+def model_params(key, data, season_length=None):
+    """
+    Параметры модели для частоты и длины сезона ряда.
+
+    Args:
+        key (str): 'sarima', 'prophet' или 'holt_winters'.
+        data (pd.Series): Временной ряд с индексом дат.
+        season_length (int): Длина сезона (по умолчанию - длина по умолчанию для частоты ряда).
+
+    Returns:
+        tuple: (частота ряда, словарь параметров модели).
+    """
+    freq = infer_frequency(data.index)
+    season_length = season_length or default_season_length(freq)
+    if key == 'sarima':
+        seasonal = 2 <= season_length <= SARIMA_MAX_SEASON_LENGTH
+        return freq, dict(SARIMA_PARAMS, seasonal_order=(1, 1, 1, season_length) if seasonal else (0, 0, 0, 0))
+    if key == 'holt_winters':
+        # Для оценки сезонной модели нужны хотя бы два полных сезона
+        if season_length < 2 or len(data) < 2 * season_length:
+            return freq, dict(HOLT_WINTERS_PARAMS, seasonal=None, seasonal_periods=None)
+        return freq, dict(HOLT_WINTERS_PARAMS, seasonal_periods=season_length)
+    # Prophet: недельная сезонность для дневных и более частых данных, суточная - для внутридневных
+    day = pd.Timedelta(days=1).total_seconds()
+    seconds = freq_seconds(freq) or 30 * day
+    return freq, dict(PROPHET_PARAMS, weekly_seasonality=seconds <= day, daily_seasonality=seconds < day)
+
+
+def fit_arima(data, order, seasonal_order, fitted_params=None):
+    """
+    Обучение модели SARIMA.
+
+    Args:
+        fitted_params (dict): Параметры модели по именам, уже оценённые при подборе порядка;
+            если заданы, модель строится по ним фильтром Калмана без повторной оптимизации.
+
+    Returns:
+        SARIMAXResults: Обученная модель.
+    """
+    model = get_backend('sarimax')(data, order=order, seasonal_order=seasonal_order)
+    if fitted_params is not None:
+        return model.smooth(np.array([fitted_params[name] for name in model.param_names]))
+    return model.fit(disp=False)
+
+
+def fit_prophet(data, init=None, **params):
+    """
+    Обучение модели Prophet.
+
+    Args:
+        data (pd.Series): Временной ряд.
+        init (dict): Начальные значения параметров для оптимизатора (тёплый старт).
+
+    Returns:
+        Prophet: Обученная модель.
+    """
+    df = pd.DataFrame({'ds': data.index, 'y': data.values})
+    model = get_backend('prophet')(**params)
+    if init is not None:
+        model.fit(df, init=init)
+    else:
+        model.fit(df)
+    return model
+
+
+def prophet_warm_start(model):
+    """
+    Параметры обученной модели Prophet в виде начальных значений для оптимизатора.
+    """
+    return {
+        'k': float(model.params['k'][0][0]),
+        'm': float(model.params['m'][0][0]),
+        'sigma_obs': float(model.params['sigma_obs'][0][0]),
+        'delta': model.params['delta'][0],
+        'beta': model.params['beta'][0],
+    }
+
+
+def update_prophet(model, new_data, **params):
+    """
+    Переобучение Prophet на ряде с дописанными наблюдениями с тёплым стартом
+    от параметров ранее обученной модели.
+
+    Args:
+        model (Prophet): Ранее обученная модель.
+        new_data (pd.Series): Новые наблюдения, продолжающие ряд модели.
+
+    Returns:
+        Prophet: Обученная модель.
+    """
+    history = pd.Series(model.history['y'].to_numpy(), index=pd.DatetimeIndex(model.history['ds']))
+    data = pd.concat([history, new_data])
+    return fit_prophet(data, init=prophet_warm_start(model), **params)
+
+
+def fit_holt_winters(data, seasonal, seasonal_periods):
+    """
+    Обучение модели Holt-Winters.
+
+    Returns:
+        HoltWintersResults: Обученная модель.
+    """
+    model = get_backend('exponential_smoothing')(data, seasonal=seasonal, seasonal_periods=seasonal_periods)
+    return model.fit()
+
+
+# Дообучение при дописывании новых наблюдений: наибольшее число новых строк и режим дообучения
+INCREMENTAL_MAX_NEW_ROWS = int(os.environ.get('TIMESEER_INCREMENTAL_MAX_NEW_ROWS', 12))
+# 1 - после добавления наблюдений параметры SARIMA переоцениваются с тёплого старта
+INCREMENTAL_REFIT = os.environ.get('TIMESEER_INCREMENTAL_REFIT', '0') == '1'
+# Число итераций оптимизатора при тёплом переобучении SARIMA
+WARM_REFIT_MAXITER = 20
+
+
+def update_arima(model_fit, new_data, refit=None, **params):
+    """
+    Дополнение обученной модели SARIMA новыми наблюдениями.
+
+    Без переобучения параметры модели фиксируются, а по новым наблюдениям только продолжается
+    фильтр Калмана. При переобучении оптимизация стартует с прежних параметров и ограничена
+    WARM_REFIT_MAXITER итерациями.
+
+    Args:
+        model_fit (SARIMAXResults): Ранее обученная модель.
+        new_data (pd.Series): Новые наблюдения, продолжающие ряд модели.
+        refit (bool): Переоценить параметры (по умолчанию INCREMENTAL_REFIT).
+
+    Returns:
+        SARIMAXResults: Модель, учитывающая новые наблюдения.
+    """
+    refit = INCREMENTAL_REFIT if refit is None else refit
+    if refit:
+        return model_fit.append(new_data, refit=True, fit_kwargs={'disp': False, 'maxiter': WARM_REFIT_MAXITER})
+    return model_fit.append(new_data, refit=False)
+
+
+def update_holt_winters(model_fit, new_data, refit=None, seasonal='add', seasonal_periods=12):
+    """
+    Дополнение обученной модели Holt-Winters новыми наблюдениями.
+
+    Без переобучения параметры сглаживания и начальные состояния фиксируются, поэтому
+    модель только пересчитывает состояния по всему ряду без оптимизации.
+
+    Args:
+        model_fit (HoltWintersResults): Ранее обученная модель.
+        new_data (pd.Series): Новые наблюдения, продолжающие ряд модели.
+        refit (bool): Переоценить параметры (по умолчанию INCREMENTAL_REFIT).
+
+    Returns:
+        HoltWintersResults: Модель, учитывающая новые наблюдения.
+    """
+    refit = INCREMENTAL_REFIT if refit is None else refit
+    data = pd.concat([model_fit.model.data.orig_endog, new_data])
+    if refit:
+        # Локальная оптимизация без перебора по сетке начальных значений
+        model = get_backend('exponential_smoothing')(data, seasonal=seasonal, seasonal_periods=seasonal_periods)
+        return model.fit(use_brute=False)
+    params = model_fit.params
+    initial = {'initial_level': params['initial_level']}
+    smoothing = {'smoothing_level': params['smoothing_level']}
+    if seasonal:
+        initial['initial_seasonal'] = params['initial_seasons']
+        smoothing['smoothing_seasonal'] = params['smoothing_seasonal']
+    model = get_backend('exponential_smoothing')(
+        data, seasonal=seasonal, seasonal_periods=seasonal_periods, initialization_method='known', **initial)
+    return model.fit(optimized=False, **smoothing)
+
+
+def arima_forecast(data, steps_ahead, season_length=None, order=None, seasonal_order=None, order_deadline=None):
     """
     Прогнозирование временного ряда с помощью SARIMA.
 
     Args:
         data (pd.Series): Временной ряд для прогнозирования.
         steps_ahead (int): Количество шагов вперёд для прогноза.
+        season_length (int): Длина сезона (по умолчанию - по частоте ряда).
+        order (tuple): Порядок (p, d, q) или 'auto' - подбор порядка select_sarima_order
+            (по умолчанию порядок из SARIMA_PARAMS или подбор при TIMESEER_SARIMA_ORDER=auto).
+        seasonal_order (tuple): Сезонный порядок (P, D, Q, m) при заданном order.
+        order_deadline (float): Крайний момент подбора порядка по time.monotonic() (None - без ограничения).
 
     Returns:
         pd.Series: Прогноз на указанное количество шагов.
     """
     try:
-        model = SARIMAX(data, order=(1, 1, 1), seasonal_order=(1, 1, 1, 12))
-        model_fit = model.fit(disp=False)
+        _, params = model_params('sarima', data, season_length)
+        order = order or (SARIMA_ORDER_MODE if SARIMA_ORDER_MODE == 'auto' else None)
+        fit_fn = fit_arima
+        if order == 'auto':
+            with span('sarima_order_selection'):
+                selection = select_sarima_order(data, season_length, deadline=order_deadline)
+            order, seasonal_order = selection['order'], selection['seasonal_order']
+            if selection.get('params') is not None:
+                # Модель выбранного порядка уже обучена при подборе: она строится по найденным
+                # параметрам и попадает в кэш обученных моделей без повторного обучения
+                fit_fn = functools.partial(fit_arima, fitted_params=selection['params'])
+        if order is not None:
+            seasonal_order = tuple(seasonal_order or params['seasonal_order'])
+            params = dict(params, order=tuple(order), seasonal_order=seasonal_order)
+        model_fit = get_or_fit('sarima', data, params, fit_fn, update_fn=update_arima,
+                               max_new_rows=INCREMENTAL_MAX_NEW_ROWS)
         forecast = model_fit.forecast(steps=steps_ahead)
         return forecast
     except Exception as e:
         print(f"Ошибка в SARIMA: {str(e)}")
         return None
 
-def prophet_forecast(data, steps_ahead):
+def prophet_forecast(data, steps_ahead, intervals=False, season_length=None):
     """
     Прогнозирование временного ряда с помощью Prophet.
 
+    В быстром режиме (PROPHET_FAST_MODE) без запроса интервалов модель обучается без выборок
+    для интервалов неопределённости. Если ряд - ранее обученный ряд с дописанными строками,
+    оптимизатор стартует с параметров прежней модели. Прогноз строится только для будущих дат.
+
     Args:
         data (pd.Series): Временной ряд для прогнозирования.
         steps_ahead (int): Количество шагов вперёд для прогноза.
+        intervals (bool): Вернуть также границы интервала прогноза.
+        season_length (int): Не используется: сезонности Prophet выбираются по частоте ряда.
 
     Returns:
-        np.ndarray: Прогноз на указанное количество шагов.
+        np.ndarray: Прогноз на указанное количество шагов
+            (при intervals=True - pd.DataFrame со столбцами yhat, yhat_lower, yhat_upper).
     """
     try:
-        df = pd.DataFrame({'ds': data.index, 'y': data.values})
-        model = Prophet(yearly_seasonality=True, weekly_seasonality=False, daily_seasonality=False)
-        model.fit(df)
-        future = model.make_future_dataframe(periods=steps_ahead, freq='MS')
+        freq, params = model_params('prophet', data, season_length)
+        if PROPHET_FAST_MODE and not intervals:
+            params['uncertainty_samples'] = 0
+        model = get_or_fit('prophet', data, params, fit_prophet, update_fn=update_prophet,
+                           max_new_rows=INCREMENTAL_MAX_NEW_ROWS)
+        future = model.make_future_dataframe(periods=steps_ahead, freq=freq, include_history=False)
         forecast = model.predict(future)
-        return forecast['yhat'][-steps_ahead:].values
+        if intervals:
+            return forecast[['yhat', 'yhat_lower', 'yhat_upper']]
+        return forecast['yhat'].to_numpy()
     except Exception as e:
         print(f"Ошибка в Prophet: {str(e)}")
         return None
 
-def holt_winters_forecast(data, steps_ahead):
+def holt_winters_forecast(data, steps_ahead, season_length=None):
     """
     Прогнозирование временного ряда с помощью Holt-Winters (Exponential Smoothing).
 
     Args:
         data (pd.Series): Временной ряд для прогнозирования.
         steps_ahead (int): Количество шагов вперёд для прогноза.
+        season_length (int): Длина сезона (по умолчанию - по частоте ряда; для ряда короче
+            двух сезонов модель строится без сезонной части).
 
     Returns:
         np.ndarray: Прогноз на указанное количество шагов.
     """
     try:
-        model = ExponentialSmoothing(data, seasonal='add', seasonal_periods=12)
-        model_fit = model.fit()
+        _, params = model_params('holt_winters', data, season_length)
+        model_fit = get_or_fit('holt_winters', data, params, fit_holt_winters,
+                               update_fn=update_holt_winters, max_new_rows=INCREMENTAL_MAX_NEW_ROWS)
         forecast = model_fit.forecast(steps_ahead)
         return forecast.values
     except Exception as e:
         print(f"Ошибка в Holt-Winters: {str(e)}")
         return None
 
-def detect_anomalies(data):
+# Параметры обучения LSTM на CPU: размер пакета и число потоков TensorFlow (0 - по числу ядер)
+LSTM_BATCH_SIZE = int(os.environ.get('TIMESEER_LSTM_BATCH_SIZE', 32))
+LSTM_THREADS = int(os.environ.get('TIMESEER_LSTM_THREADS', 0))
+# Файл для сохранения обученной LSTM
+LSTM_MODEL_PATH = os.environ.get('TIMESEER_LSTM_MODEL_PATH', 'lstm_model.keras')
+
+
+def _tensorflow(threads=None):
+    """
+    Импортирует TensorFlow при первом вызове и задаёт число потоков CPU.
+
+    Число потоков можно задать только до первой операции TensorFlow, поэтому
+    последующие попытки изменить его игнорируются.
+    """
+    tf = importlib.import_module('tensorflow')
+    threads = LSTM_THREADS if threads is None else threads
+    if threads:
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(threads)
+            tf.config.threading.set_inter_op_parallelism_threads(1)
+        except RuntimeError:
+            pass
+    return tf
+
+
+def train_lstm_model(X, y, timesteps, n_features, epochs=10, batch_size=None, threads=None, units=50):
+    """
+    Обучение LSTM для прогнозирования на шаг вперёд.
+
+    Args:
+        X (np.ndarray): Окна формы (n_windows, timesteps, n_features) (см. prepare_time_series).
+        y (np.ndarray): Следующие значения формы (n_windows,).
+        timesteps (int): Длина окна.
+        n_features (int): Число признаков.
+        epochs (int): Число эпох.
+        batch_size (int): Размер пакета (по умолчанию LSTM_BATCH_SIZE).
+        threads (int): Число потоков CPU (по умолчанию LSTM_THREADS).
+        units (int): Число нейронов LSTM.
+
+    Returns:
+        keras.Model: Обученная модель.
+    """
+    tf = _tensorflow(threads)
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=(timesteps, n_features)),
+        tf.keras.layers.LSTM(units),
+        tf.keras.layers.Dense(1),
+    ])
+    model.compile(optimizer='adam', loss='mse')
+    model.fit(X, y, epochs=epochs, batch_size=batch_size or LSTM_BATCH_SIZE, verbose=0)
+    return model
+
+
+def save_lstm_model(model, path=LSTM_MODEL_PATH):
+    """
+    Сохраняет обученную LSTM (архитектуру и веса) в файл формата .keras.
+    """
+    model.save(path)
+    return path
+
+
+def load_lstm_model(path=LSTM_MODEL_PATH, threads=None):
+    """
+    Загружает LSTM, сохранённую save_lstm_model.
+
+    Returns:
+        keras.Model: Модель или None, если файла нет.
+    """
+    if not os.path.exists(path):
+        return None
+    return _tensorflow(threads).keras.models.load_model(path)
+
+
+def lstm_forecast(model, history, timesteps, steps_ahead):
     """
-    Обнаружение аномалий с помощью Isolation Forest.
+    Рекурсивный прогноз LSTM на несколько шагов вперёд.
+
+    Окно и прогнозы хранятся в одном заранее выделенном буфере; на каждом шаге модель
+    получает представление окна в буфере, а прогноз дописывается в его конец, поэтому
+    окно не копируется и не сдвигается.
+
+    Args:
+        model (keras.Model): Обученная модель.
+        history (np.ndarray): Исторические значения (используются последние timesteps).
+        timesteps (int): Длина окна.
+        steps_ahead (int): Количество шагов вперёд для прогноза.
+
+    Returns:
+        np.ndarray: Прогноз на указанное количество шагов.
+    """
+    buffer = np.empty(timesteps + steps_ahead, dtype=np.float32)
+    buffer[:timesteps] = np.asarray(history, dtype=np.float32)[-timesteps:]
+    for step in range(steps_ahead):
+        window = buffer[step:step + timesteps].reshape(1, timesteps, 1)
+        # Прямой вызов модели дешевле model.predict для одного окна
+        buffer[timesteps + step] = float(model(window, training=False)[0, 0])
+    return buffer[timesteps:].astype(float)
+
+
+# Метод обнаружения аномалий по умолчанию: isolation_forest, robust_zscore или half_space_trees
+ANOMALY_METHOD = os.environ.get('TIMESEER_ANOMALY_METHOD', 'isolation_forest')
+# Наибольшее число дописанных строк, которые оцениваются сохранённым Isolation Forest без переобучения
+ANOMALY_MAX_NEW_ROWS = int(os.environ.get('TIMESEER_ANOMALY_MAX_NEW_ROWS', 1000))
+
+# Потоковые детекторы: состояние обновляется за O(1) на новую точку
+ONLINE_DETECTORS = {
+    'robust_zscore': RobustZScoreDetector,
+    'half_space_trees': HalfSpaceTrees,
+}
+
+
+def fit_isolation_forest(data, contamination=0.1, max_samples='auto', n_jobs=None):
+    """
+    Обучение Isolation Forest.
+
+    Args:
+        data (pd.DataFrame): Данные для обучения.
+        contamination (float): Ожидаемая доля аномалий.
+        max_samples (int, float или 'auto'): Размер подвыборки для каждого дерева.
+        n_jobs (int): Число потоков обучения.
+
+    Returns:
+        IsolationForest: Обученная модель.
+    """
+    model = get_backend('isolation_forest')(contamination=contamination, max_samples=max_samples,
+                                            n_jobs=n_jobs, random_state=42)
+    return model.fit(data)
+
+
+def _reuse_isolation_forest(model, new_data, **params):
+    # Дописанные строки оцениваются уже обученным лесом без переобучения
+    return model
+
+
+def score_anomalies(model, data):
+    """
+    Оценка данных сохранённой моделью Isolation Forest без переобучения.
+
+    Returns:
+        np.ndarray: Метки аномалий (-1 для аномалий, 1 для нормальных точек).
+    """
+    return model.predict(data)
+
+
+def fit_online_detector(data, method):
+    """
+    Создание потокового детектора и обработка им всех наблюдений.
+
+    Returns:
+        tuple: (детектор RobustZScoreDetector или HalfSpaceTrees с накопленным состоянием,
+            метки аномалий всех наблюдений в np.int8).
+    """
+    detector = ONLINE_DETECTORS[method]()
+    labels = detector.fit_predict(data.to_numpy()).astype(np.int8)
+    return detector, labels
+
+
+def update_online_detector(fitted, new_data, method):
+    """
+    Обработка дописанных наблюдений потоковым детектором (O(1) на точку).
+
+    Returns:
+        tuple: (копия детектора с обновлённым состоянием, метки всех наблюдений).
+    """
+    detector, labels = fitted
+    # Копия нужна, чтобы не менять детектор, сохранённый в кэше для предыдущей версии ряда;
+    # состояние детектора не зависит от длины ряда, поэтому копирование стоит O(1)
+    detector = copy.deepcopy(detector)
+    new_labels = detector.fit_predict(new_data.to_numpy()).astype(np.int8)
+    return detector, np.concatenate([labels, new_labels])
+
+
+@span('detect_anomalies')
+def detect_anomalies(data, method=None, model=None, contamination=0.1, max_samples='auto', n_jobs=None):
+    """
+    Обнаружение аномалий с помощью Isolation Forest или потокового детектора.
+
+    Обученный Isolation Forest кэшируется по содержимому данных; если к ранее обработанным
+    данным дописаны строки, они оцениваются сохранённой моделью только через predict.
+    Потоковые детекторы (robust_zscore, half_space_trees) обрабатывают дописанные строки
+    за O(1) на точку.
 
     Args:
         data (pd.DataFrame): Данные для анализа.
+        method (str): isolation_forest, robust_zscore или half_space_trees (по умолчанию ANOMALY_METHOD).
+        model (IsolationForest): Ранее обученная модель; если задана, данные только оцениваются.
+        contamination (float): Ожидаемая доля аномалий (для Isolation Forest).
+        max_samples (int, float или 'auto'): Размер подвыборки для дерева (для Isolation Forest).
+        n_jobs (int): Число потоков (для Isolation Forest).
 
     Returns:
         np.ndarray: Метки аномалий (-1 для аномалий, 1 для нормальных точек).
     """
     try:
-        model = IsolationForest(contamination=0.1, random_state=42)
-        anomalies = model.fit_predict(data)
-        return anomalies
+        if model is not None:
+            return score_anomalies(model, data)
+        method = method or ANOMALY_METHOD
+        if method in ONLINE_DETECTORS:
+            _, labels = get_or_fit(method, data, {'method': method}, fit_online_detector,
+                                   update_fn=update_online_detector)
+            return labels[:len(data)].astype(int)
+        params = {'contamination': contamination, 'max_samples': max_samples, 'n_jobs': n_jobs}
+        model = get_or_fit('isolation_forest', data, params, fit_isolation_forest,
+                           update_fn=_reuse_isolation_forest, max_new_rows=ANOMALY_MAX_NEW_ROWS)
+        return score_anomalies(model, data)
     except Exception as e:
         print(f"Ошибка в обнаружении аномалий: {str(e)}")
         return None
 
-def cluster_data(data):
+# Метод кластеризации по умолчанию: kmeans, minibatch или auto (minibatch для больших данных)
+CLUSTER_METHOD = os.environ.get('TIMESEER_CLUSTER_METHOD', 'auto')
+# Число строк, начиная с которого в режиме auto используется MiniBatchKMeans
+CLUSTER_LARGE_DATA_ROWS = int(os.environ.get('TIMESEER_CLUSTER_LARGE_DATA_ROWS', 100_000))
+# Кандидаты числа кластеров и размер подвыборки для автоматического выбора k
+CLUSTER_K_CANDIDATES = tuple(range(2, 9))
+CLUSTER_SELECTION_SAMPLE = 5_000
+# Размер подвыборки для вычисления коэффициента силуэта (его стоимость квадратична по числу точек)
+SILHOUETTE_SAMPLE = 2_000
+# Наибольшее число дописанных строк, которые добавляются в модель без полного переобучения
+CLUSTER_MAX_NEW_ROWS = int(os.environ.get('TIMESEER_CLUSTER_MAX_NEW_ROWS', 100_000))
+
+
+def _make_kmeans(n_clusters, method, batch_size):
+    if method == 'minibatch':
+        return get_backend('minibatch_kmeans')(n_clusters=n_clusters, batch_size=batch_size, n_init=3,
+                                               random_state=42)
+    return get_backend('kmeans')(n_clusters=n_clusters, random_state=42)
+
+
+def _silhouette_for_k(sample, n_clusters, method, batch_size):
+    labels = _make_kmeans(n_clusters, method, batch_size).fit_predict(sample)
+    return get_backend('silhouette_score')(sample, labels, sample_size=min(SILHOUETTE_SAMPLE, len(sample)),
+                                           random_state=42)
+
+
+def select_n_clusters(data, candidates=CLUSTER_K_CANDIDATES, sample_size=CLUSTER_SELECTION_SAMPLE,
+                      method='minibatch', batch_size=4096, n_jobs=-1):
+    """
+    Автоматический выбор числа кластеров по коэффициенту силуэта.
+
+    Кандидаты оцениваются параллельно на случайной подвыборке, поэтому стоимость выбора
+    не зависит от длины ряда.
+
+    Args:
+        data (pd.DataFrame): Данные для кластеризации.
+        candidates (tuple): Кандидаты числа кластеров.
+        sample_size (int): Размер подвыборки.
+        method (str): kmeans или minibatch.
+        batch_size (int): Размер пакета MiniBatchKMeans.
+        n_jobs (int): Число параллельных задач joblib (-1 - все ядра).
+
+    Returns:
+        int: Выбранное число кластеров.
+    """
+    from joblib import Parallel, delayed
+
+    values = np.asarray(data, dtype=float)
+    if len(values) > sample_size:
+        rng = np.random.default_rng(42)
+        values = values[rng.choice(len(values), size=sample_size, replace=False)]
+    candidates = [k for k in candidates if 1 < k < len(np.unique(values, axis=0))]
+    if not candidates:
+        return 1
+    scores = Parallel(n_jobs=n_jobs, prefer='threads')(
+        delayed(_silhouette_for_k)(values, k, method, batch_size) for k in candidates)
+    return candidates[int(np.argmax(scores))]
+
+
+def fit_clusters(data, n_clusters=3, method='kmeans', batch_size=4096):
+    """
+    Обучение KMeans или MiniBatchKMeans.
+
+    Args:
+        data (pd.DataFrame): Данные для кластеризации.
+        n_clusters (int или 'auto'): Число кластеров; 'auto' - выбор по коэффициенту силуэта.
+        method (str): kmeans или minibatch.
+        batch_size (int): Размер пакета MiniBatchKMeans.
+
+    Returns:
+        KMeans или MiniBatchKMeans: Обученная модель.
+    """
+    if n_clusters == 'auto':
+        n_clusters = select_n_clusters(data, method=method, batch_size=batch_size)
+    return _make_kmeans(n_clusters, method, batch_size).fit(data)
+
+
+def update_clusters(model, new_data, n_clusters=3, method='kmeans', batch_size=4096):
+    """
+    Добавление дописанных строк в модель кластеризации.
+
+    MiniBatchKMeans дообучается через partial_fit; центроиды полного KMeans используются без изменений.
+
+    Returns:
+        KMeans или MiniBatchKMeans: Модель для новой версии данных.
     """
-    Кластеризация данных с помощью KMeans.
+    if method != 'minibatch':
+        return model
+    # Копия нужна, чтобы не менять модель, сохранённую в кэше для предыдущей версии данных
+    model = copy.deepcopy(model)
+    return partial_fit_clusters([new_data], model=model)
+
+
+def partial_fit_clusters(chunks, n_clusters=3, batch_size=4096, model=None):
+    """
+    Потоковое обучение MiniBatchKMeans по частям данных, не помещающихся в память целиком.
+
+    Args:
+        chunks (iterable): Части данных (массивы или pd.DataFrame одинаковой ширины).
+        n_clusters (int): Число кластеров (если модель не задана).
+        batch_size (int): Размер пакета.
+        model (MiniBatchKMeans): Модель для дообучения.
+
+    Returns:
+        MiniBatchKMeans: Обученная модель.
+    """
+    if model is None:
+        model = get_backend('minibatch_kmeans')(n_clusters=n_clusters, batch_size=batch_size, random_state=42)
+    for chunk in chunks:
+        # pd.DataFrame передаётся как есть, чтобы сохранить имена признаков
+        rows = chunk.iloc if hasattr(chunk, 'iloc') else np.asarray(chunk, dtype=float)
+        for start in range(0, len(chunk), batch_size):
+            model.partial_fit(rows[start:start + batch_size])
+    return model
+
+
+@span('cluster_data')
+def cluster_data(data, n_clusters=3, method=None, batch_size=4096, model=None):
+    """
+    Кластеризация данных с помощью KMeans или MiniBatchKMeans.
+
+    Обученные центроиды кэшируются по содержимому данных, поэтому повторный запрос выполняет
+    только predict.
 
     Args:
         data (pd.DataFrame): Данные для кластеризации.
+        n_clusters (int или 'auto'): Число кластеров; 'auto' - выбор по коэффициенту силуэта.
+        method (str): kmeans, minibatch или auto (по умолчанию CLUSTER_METHOD).
+        batch_size (int): Размер пакета MiniBatchKMeans.
+        model (KMeans или MiniBatchKMeans): Ранее обученная модель; если задана, данные только размечаются.
 
     Returns:
         np.ndarray: Метки кластеров.
     """
     try:
-        model = KMeans(n_clusters=3, random_state=42)
-        clusters = model.fit_predict(data)
+        if model is None:
+            method = method or CLUSTER_METHOD
+            if method == 'auto':
+                method = 'minibatch' if len(data) >= CLUSTER_LARGE_DATA_ROWS else 'kmeans'
+            params = {'n_clusters': n_clusters, 'method': method, 'batch_size': batch_size}
+            model = get_or_fit('kmeans', data, params, fit_clusters, update_fn=update_clusters,
+                               max_new_rows=CLUSTER_MAX_NEW_ROWS)
+        clusters = model.predict(data)
         return clusters
     except Exception as e:
         print(f"Ошибка в кластеризации: {str(e)}")
         return None
+
+
+# Реестр моделей прогнозирования: ключ формы -> (отображаемое имя, функция прогноза)
+FORECAST_MODELS = {
+    'sarima': ('SARIMA', arima_forecast),
+    'prophet': ('Prophet', prophet_forecast),
+    'holt_winters': ('Holt-Winters', holt_winters_forecast),
+}
+
+# Число процессов для параллельного обучения моделей (переопределяется переменной окружения)
+FORECAST_WORKERS = int(os.environ.get('TIMESEER_FORECAST_WORKERS', len(FORECAST_MODELS)))
+# Срок прогнозирования на один запрос в секундах
+FORECAST_BUDGET_SECONDS = float(os.environ.get('TIMESEER_FORECAST_BUDGET', 120))
+# Сроки отдельных моделей в секундах (TIMESEER_SARIMA_BUDGET, TIMESEER_PROPHET_BUDGET, ...)
+MODEL_BUDGET_SECONDS = {key: float(os.environ.get(f'TIMESEER_{key.upper()}_BUDGET', default))
+                        for key, default in (('sarima', 60), ('prophet', 60), ('holt_winters', 30))}
+# 1 - если ни одна модель не построила прогноз, возвращается сезонный наивный прогноз
+FORECAST_FALLBACK = os.environ.get('TIMESEER_FORECAST_FALLBACK', '1') == '1'
+
+# Модули, которые сервер рабочих процессов (forkserver) импортирует один раз: сам модуль
+# и бэкенды моделей прогнозирования
+FORECAST_PRELOAD = ['ai_module'] + [MODEL_BACKENDS[name][0] for name in ('sarimax', 'exponential_smoothing', 'prophet')]
+
+
+def forecast_settings():
+    """
+    Настройки процесса, от которых зависят прогнозы, метки аномалий и кластеры (для ключей
+    кэшированных ответов: ответ, полученный при других настройках, не используется).
+
+    Returns:
+        dict: Имя настройки -> значение.
+    """
+    return {
+        'sarima_order': SARIMA_ORDER_MODE, 'sarima_params': SARIMA_PARAMS, 'prophet_params': PROPHET_PARAMS,
+        'prophet_fast': PROPHET_FAST_MODE, 'holt_winters_params': HOLT_WINTERS_PARAMS,
+        'incremental_max_new_rows': INCREMENTAL_MAX_NEW_ROWS, 'incremental_refit': INCREMENTAL_REFIT,
+        'forecast_budget': FORECAST_BUDGET_SECONDS, 'model_budgets': MODEL_BUDGET_SECONDS,
+        'forecast_fallback': FORECAST_FALLBACK, 'anomaly_method': ANOMALY_METHOD,
+        'cluster_method': CLUSTER_METHOD, 'model_cache_generation': model_cache.generation,
+    }
+
+
+_worker_pool = None
+
+
+def get_worker_pool(max_workers=None):
+    """
+    Возвращает общий пул прерываемых рабочих процессов, создавая его при первом вызове.
+
+    Args:
+        max_workers (int): Число сохраняемых между запросами процессов и наибольшее число моделей,
+            обучаемых одновременно всеми запросами (по умолчанию FORECAST_WORKERS).
+
+    Returns:
+        KillableWorkerPool: Пул процессов.
+    """
+    global _worker_pool
+    if _worker_pool is None:
+        max_workers = max_workers or FORECAST_WORKERS
+        _worker_pool = KillableWorkerPool(max_idle=max_workers, preload=FORECAST_PRELOAD, max_running=max_workers)
+    return _worker_pool
+
+
+def shutdown_worker_pool():
+    """
+    Останавливает общий пул процессов.
+    """
+    global _worker_pool
+    if _worker_pool is not None:
+        _worker_pool.shutdown()
+        _worker_pool = None
+
+
+def seasonal_naive_forecast(data, steps_ahead, season_length=None):
+    """
+    Сезонный наивный прогноз: повторение значений последнего сезона.
+
+    Args:
+        data (pd.Series): Временной ряд.
+        steps_ahead (int): Количество шагов вперёд для прогноза.
+        season_length (int): Длина сезона (по умолчанию - по частоте ряда; для короткого ряда
+            повторяется последнее значение).
+
+    Returns:
+        np.ndarray: Прогноз на указанное количество шагов.
+    """
+    if season_length is None:
+        season_length = default_season_length(infer_frequency(data.index))
+    values = np.asarray(data, dtype=float)
+    last_season = values[-season_length:] if len(values) >= season_length else values[-1:]
+    return np.resize(last_season, steps_ahead)
+
+
+def _timed_forecast(key, data, steps_ahead, season_length=None, options=None, refresh=False):
+    """
+    Прогноз моделью с измерением времени (выполняется в рабочем процессе).
+
+    Args:
+        options (dict): Дополнительные параметры функции прогноза (например, порядок SARIMA).
+        refresh (bool): Обучить модель заново, не читая кэш моделей (см. model_cache.cache_refresh).
+
+    Returns:
+        tuple: (прогноз, время в секундах).
+    """
+    start = time.perf_counter()
+    with cache_refresh(refresh):
+        forecast = FORECAST_MODELS[key][1](data, steps_ahead, season_length=season_length, **(options or {}))
+    return forecast, time.perf_counter() - start
+
+
+def _collect_forecast(key, forecast, seconds):
+    """
+    Приводит результат функции прогноза к единому виду и записывает время обучения модели.
+    """
+    name = FORECAST_MODELS[key][0]
+    observe_stage(f"model_{key}", seconds)
+    if forecast is None:
+        return {'name': name, 'forecast': None, 'error': f"Модель {name} не вернула прогноз", 'seconds': seconds,
+                'status': 'error'}
+    return {'name': name, 'forecast': np.asarray(forecast, dtype=float), 'error': None, 'seconds': seconds,
+            'status': 'ok'}
+
+
+def run_forecasts(data, steps_ahead, model_keys, max_workers=None, budget=None, season_length=None):
+    """
+    Параллельное прогнозирование несколькими моделями в прерываемых рабочих процессах.
+
+    Время выполнения определяется самой медленной моделью, а не суммой времени всех моделей,
+    и ограничено сроком запроса budget и сроками моделей MODEL_BUDGET_SECONDS. Модель, не
+    уложившаяся в срок, прерывается и получает состояние 'timeout'; прогнозы завершившихся
+    моделей возвращаются. Срок модели отсчитывается с момента, когда её задача получила место
+    в пуле (одновременно обучается не больше FORECAST_WORKERS моделей всех запросов процесса).
+    Если ни одна модель не построила прогноз, добавляется сезонный
+    наивный прогноз (ключ 'seasonal_naive', состояние 'fallback'). При TIMESEER_SARIMA_ORDER=auto
+    порядок SARIMA подбирается select_sarima_order в задаче SARIMA параллельно с остальными
+    моделями (кандидаты оцениваются последовательно в рабочем процессе; для ранее обработанного
+    ряда порядок берётся из кэша), а выбранная модель не обучается повторно. Внутри
+    model_cache.cache_refresh() модели обучаются заново и в рабочих процессах.
+
+    Args:
+        data (pd.Series): Временной ряд для прогнозирования.
+        steps_ahead (int): Количество шагов вперёд для прогноза.
+        model_keys (list): Ключи моделей из FORECAST_MODELS.
+        max_workers (int): Число сохраняемых процессов пула (по умолчанию FORECAST_WORKERS).
+        budget (float): Срок прогнозирования в секундах (по умолчанию FORECAST_BUDGET_SECONDS).
+        season_length (int): Длина сезона (по умолчанию - по частоте ряда).
+
+    Returns:
+        dict: Ключ модели -> {'name': имя, 'forecast': np.ndarray или None, 'error': текст ошибки или None,
+            'seconds': время обучения и прогноза, 'status': 'ok', 'error', 'timeout' или 'fallback'}.
+            Порядок ключей совпадает с model_keys.
+    """
+    budget = FORECAST_BUDGET_SECONDS if budget is None else budget
+    start = time.monotonic()
+    limits = {key: min(budget, MODEL_BUDGET_SECONDS.get(key, budget)) for key in model_keys}
+    options = {}
+    if 'sarima' in model_keys and SARIMA_ORDER_MODE == 'auto':
+        # Порядок подбирается в задаче SARIMA, поэтому остальные модели не ждут поиска, а его время
+        # входит во время и срок SARIMA. В рабочем процессе кандидаты оцениваются последовательно:
+        # параллельная оценка заняла бы места пула, нужные остальным моделям и запросам
+        options['sarima'] = {'order': 'auto',
+                             'order_deadline': start + SARIMA_AUTO_BUDGET_SHARE * limits['sarima']}
+    refresh = refresh_requested()
+    tasks = {key: (_timed_forecast, (key, data, steps_ahead, season_length, options.get(key), refresh))
+             for key in model_keys}
+    outcomes = get_worker_pool(max_workers).run(tasks, limits)
+
+    results = {}
+    for key, (status, value) in outcomes.items():
+        name = FORECAST_MODELS[key][0]
+        if status == OK:
+            results[key] = _collect_forecast(key, *value)
+        elif status == TIMEOUT:
+            MODEL_TIMEOUTS.inc(model=key)
+            results[key] = {'name': name, 'forecast': None, 'seconds': limits[key], 'status': 'timeout',
+                            'error': f"Модель {name} не уложилась в срок {limits[key]:g} с"}
+        else:
+            results[key] = {'name': name, 'forecast': None, 'error': value, 'seconds': None, 'status': 'error'}
+
+    if FORECAST_FALLBACK and not any(result['forecast'] is not None for result in results.values()):
+        fallback_start = time.perf_counter()
+        results['seasonal_naive'] = {'name': 'Сезонный наивный', 'error': None, 'status': 'fallback',
+                                     'forecast': seasonal_naive_forecast(data, steps_ahead, season_length),
+                                     'seconds': time.perf_counter() - fallback_start}
+    return results
+
+
+# Подбор порядка SARIMA: 'fixed' - порядок из SARIMA_PARAMS, 'auto' - пошаговый поиск по AIC
+SARIMA_ORDER_MODE = os.environ.get('TIMESEER_SARIMA_ORDER', 'fixed')
+# Наибольшие порядки p, q и P, Q при поиске и наибольшая сумма p + q + P + Q
+SARIMA_AUTO_MAX_ORDER = 3
+SARIMA_AUTO_MAX_SEASONAL_ORDER = 1
+SARIMA_AUTO_MAX_TOTAL_ORDER = 5
+# Наибольшее число шагов поиска
+SARIMA_AUTO_MAX_ROUNDS = 10
+# Число итераций оптимизатора при предварительной оценке кандидата и запас по AIC, при котором он
+# оценивается полностью (кандидаты с AIC хуже лучшего более чем на запас отбрасываются)
+SARIMA_AUTO_PRUNE_MAXITER = 10
+SARIMA_AUTO_AIC_MARGIN = 10.0
+# Доля срока SARIMA, отводимая на последовательный подбор порядка в run_forecasts; выбранная модель
+# не обучается заново, поэтому остаток нужен только на завершение текущего кандидата и прогноз
+SARIMA_AUTO_BUDGET_SHARE = 0.9
+# Начальные кандидаты (p, q, P, Q), как в пошаговом алгоритме Хайндмана-Хандакара
+SARIMA_AUTO_START = [(2, 2, 1, 1), (0, 0, 0, 0), (1, 0, 1, 0), (0, 1, 0, 1)]
+
+
+def _sarima_start_params(param_names, reference):
+    """
+    Начальные параметры кандидата по параметрам соседней модели: совпадающие по имени параметры
+    берутся из неё, новые коэффициенты AR и MA начинаются с нуля.
+    """
+    if not reference:
+        return None
+    return np.array([reference.get(name, 0.0) for name in param_names], dtype=float)
+
+
+def _fit_sarima_candidate(data, order, seasonal_order, reference=None, maxiter=None):
+    """
+    Обучение кандидата при подборе порядка SARIMA (выполняется в рабочем процессе).
+
+    Returns:
+        tuple: (AIC, параметры модели по именам).
+    """
+    import warnings
+
+    model = get_backend('sarimax')(data, order=order, seasonal_order=seasonal_order)
+    fit_kwargs = {'disp': False}
+    if maxiter is not None:
+        fit_kwargs['maxiter'] = maxiter
+    start_params = _sarima_start_params(model.param_names, reference)
+    with warnings.catch_warnings():
+        # Предварительные оценки с ограниченным числом итераций обычно не сходятся
+        warnings.simplefilter('ignore')
+        model_fit = None
+        if start_params is not None:
+            try:
+                model_fit = model.fit(start_params=start_params, **fit_kwargs)
+            except Exception:
+                model_fit = None
+            if model_fit is not None and not np.isfinite(model_fit.aic):
+                model_fit = None
+        if model_fit is None:
+            # Тёплый старт от параметров соседней модели может не сойтись (например, ошибка
+            # решателя Шура), поэтому кандидат оценивается заново с начальными параметрами по умолчанию
+            model_fit = model.fit(**fit_kwargs)
+    aic = float(model_fit.aic)
+    return (aic if np.isfinite(aic) else np.inf), dict(zip(model.param_names, np.asarray(model_fit.params)))
+
+
+def _sarima_neighbours(candidate, seasonal):
+    """
+    Соседи кандидата (p, q, P, Q): изменение одного порядка на единицу и одновременное изменение p и q.
+    """
+    p, q, P, Q = candidate
+    steps = [(1, 0, 0, 0), (-1, 0, 0, 0), (0, 1, 0, 0), (0, -1, 0, 0), (1, 1, 0, 0), (-1, -1, 0, 0)]
+    if seasonal:
+        steps += [(0, 0, 1, 0), (0, 0, -1, 0), (0, 0, 0, 1), (0, 0, 0, -1)]
+    neighbours = []
+    for dp, dq, dP, dQ in steps:
+        new = (p + dp, q + dq, P + dP, Q + dQ)
+        if (0 <= new[0] <= SARIMA_AUTO_MAX_ORDER and 0 <= new[1] <= SARIMA_AUTO_MAX_ORDER
+                and 0 <= new[2] <= SARIMA_AUTO_MAX_SEASONAL_ORDER and 0 <= new[3] <= SARIMA_AUTO_MAX_SEASONAL_ORDER
+                and sum(new) <= SARIMA_AUTO_MAX_TOTAL_ORDER):
+            neighbours.append(new)
+    return neighbours
+
+
+def _evaluate_sarima_candidates(data, candidates, orders, references, maxiter, deadline):
+    """
+    Оценивает кандидатов параллельно в пуле процессов (в рабочем процессе пула, который не может
+    запускать дочерние процессы, - последовательно).
+
+    Returns:
+        dict: Кандидат -> (AIC, параметры); кандидаты с ошибкой или не уложившиеся в срок пропускаются.
+    """
+    import multiprocessing
+
+    results = {}
+    if multiprocessing.current_process().daemon:
+        for candidate in candidates:
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            try:
+                results[candidate] = _fit_sarima_candidate(data, *orders[candidate], references.get(candidate),
+                                                           maxiter)
+            except Exception as e:
+                print(f"Ошибка в SARIMA{orders[candidate]}: {str(e)}")
+        return results
+
+    tasks = {candidate: (_fit_sarima_candidate, (data, *orders[candidate], references.get(candidate), maxiter))
+             for candidate in candidates}
+    timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+    for candidate, status, value in get_worker_pool().iter_run(tasks, dict.fromkeys(tasks, timeout),
+                                                               FORECAST_WORKERS):
+        if status == OK:
+            results[candidate] = value
+    return results
+
+
+def select_sarima_order(data, season_length=None, deadline=None):
+    """
+    Автоматический подбор порядка SARIMA пошаговым поиском по AIC.
+
+    Поиск начинается с кандидатов SARIMA_AUTO_START и на каждом шаге переходит к лучшему соседу
+    текущей лучшей модели, пока AIC уменьшается. Кандидаты шага оцениваются параллельно в пуле
+    процессов: сначала за SARIMA_AUTO_PRUNE_MAXITER итераций с тёплого старта от параметров
+    лучшей модели, затем полностью - только те, чей AIC не хуже лучшего более чем на
+    SARIMA_AUTO_AIC_MARGIN. Порядки разности фиксированы (d = 1, D = 1 для сезонной модели).
+    Результат завершённого поиска кэшируется по хэшу ряда, поэтому повторный запрос с тем же
+    рядом не выполняет поиск (кроме пересчёта внутри cache_refresh()).
+
+    Args:
+        data (pd.Series): Временной ряд.
+        season_length (int): Длина сезона (по умолчанию - по частоте ряда).
+        deadline (float): Крайний момент поиска по time.monotonic() (None - без ограничения);
+            по истечении срока возвращается лучший найденный порядок.
+
+    Returns:
+        dict: 'order', 'seasonal_order', 'aic' (None, если ни один кандидат не оценён),
+            'params' - параметры выбранной модели по именам (для построения модели без
+            повторного обучения, см. fit_arima) и 'evaluated' - число оценённых кандидатов.
+    """
+    _, params = model_params('sarima', data, season_length)
+    m = params['seasonal_order'][3]
+    seasonal = m > 0
+    cache_key = make_cache_key('sarima_order', fingerprint_series(data), {'season_length': m})
+    cached = None if refresh_requested() else model_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    def orders_of(candidate):
+        p, q, P, Q = candidate
+        return (p, 1, q), ((P, 1, Q, m) if seasonal else (0, 0, 0, 0))
+
+    visited = {}
+    best = None
+    frontier = [c if seasonal else (c[0], c[1], 0, 0) for c in SARIMA_AUTO_START]
+    completed = False
+    for _ in range(SARIMA_AUTO_MAX_ROUNDS):
+        candidates = list(dict.fromkeys(c for c in frontier if c not in visited))
+        if not candidates:
+            completed = True
+            break
+        orders = {candidate: orders_of(candidate) for candidate in candidates}
+        reference = visited[best][1] if best is not None else None
+        preliminary = _evaluate_sarima_candidates(data, candidates, orders, dict.fromkeys(candidates, reference),
+                                                  SARIMA_AUTO_PRUNE_MAXITER, deadline)
+        if not preliminary:
+            break
+        scores = [aic for aic, _ in preliminary.values()]
+        if best is not None:
+            scores.append(visited[best][0])
+        threshold = min(scores) + SARIMA_AUTO_AIC_MARGIN
+        survivors = [c for c, (aic, _) in preliminary.items() if aic <= threshold]
+        final = _evaluate_sarima_candidates(data, survivors, orders,
+                                            {c: preliminary[c][1] for c in survivors}, None, deadline)
+        for candidate in candidates:
+            visited[candidate] = final.get(candidate, (np.inf, None))
+
+        round_best = min(final, key=lambda c: final[c][0], default=None)
+        if round_best is None or (best is not None and final[round_best][0] >= visited[best][0]):
+            completed = len(final) == len(survivors)
+            break
+        best = round_best
+        frontier = _sarima_neighbours(best, seasonal)
+    else:
+        completed = True
+
+    if best is None:
+        return {'order': params['order'], 'seasonal_order': params['seasonal_order'], 'aic': None,
+                'params': None, 'evaluated': len(visited)}
+    order, seasonal_order = orders_of(best)
+    selection = {'order': order, 'seasonal_order': seasonal_order, 'aic': visited[best][0],
+                 'params': visited[best][1], 'evaluated': len(visited)}
+    if completed:
+        model_cache.put(cache_key, selection, replace=refresh_requested())
+    return selection
@@ -1,11 +1,34 @@
-from flask import Flask, render_template, request
+import time
+
+# Момент начала импорта приложения (для измерения времени запуска)
+_startup_started = time.perf_counter()
+
+from flask import Flask, Response, render_template, request, jsonify, g, stream_with_context
 import pandas as pd
+import numpy as np
 import os
 import logging
-from data_processing import load_data, preprocess_data
-from ai_module import arima_forecast, prophet_forecast, holt_winters_forecast, detect_anomalies, cluster_data
-from uml_module import update_forecast_plot, update_uml_diagram
-from visualization import plot_forecast, create_metrics_table
+import tempfile
+import shutil
+import threading
+import uuid
+import json
+from contextlib import ExitStack
+from data_processing import load_upload, preprocess_series
+from frequency import prepare_series
+from dataset_cache import save_upload
+from batch import run_batch
+from response_cache import RESPONSE_CACHE_ENABLED, CachedResponse, ResponseCache, response_key
+from ai_module import (FORECAST_MODELS, FORECAST_BUDGET_SECONDS, run_forecasts, detect_anomalies, cluster_data,
+                       warm_up, backend_import_seconds, forecast_settings)
+from model_cache import LRUCache, cache_refresh
+from shared_store import get_shared_store
+from uml_module import build_forecast_plot_figure, update_uml_diagram
+from visualization import (CHART_FORMATS, build_forecast_figure, render_figure, forecast_series,
+                           forecast_columns, history_page, to_arrow_ipc, format_dates)
+from jobs import JobQueue, QueueFullError, DONE, FAILED, CANCELLED
+from instrumentation import (registry, span, REQUESTS, REQUEST_SECONDS, start_request_timings,
+                             finish_request_timings, format_timings, profile_request)
 
 # Настройка логирования
 logging.basicConfig(level=logging.INFO, filename='C:\\Users\\User\\Desktop\\МИЭМ\\ВКР\\VKR\\app.log', filemode='a',
@@ -25,6 +48,101 @@ static_path = app.static_folder
 logging.info(f"Путь к папке шаблонов: {template_path}")
 logging.info(f"Путь к папке статических файлов: {static_path}")
 
+# Очередь фоновых заданий прогнозирования
+job_queue = JobQueue()
+
+# Результаты прогнозирования по идентификатору (для графиков, строящихся по запросу); при запуске
+# через serve.py результаты хранятся и в общей памяти, чтобы их видели все рабочие процессы
+RESULT_CACHE_SIZE = int(os.environ.get('TIMESEER_RESULT_CACHE_SIZE', 64))
+result_store = LRUCache(RESULT_CACHE_SIZE, shared=get_shared_store())
+# Отрисованные графики по (идентификатор результата, график, формат)
+chart_cache = LRUCache(RESULT_CACHE_SIZE * 2)
+# Ответы /predict по хэшу загруженного файла и параметрам формы
+response_cache = ResponseCache()
+_chart_lock = threading.Lock()
+_chart_locks = {}
+
+# Число строк таблицы исторических данных на одной странице
+HISTORY_PAGE_SIZE = int(os.environ.get('TIMESEER_HISTORY_PAGE_SIZE', 50))
+HISTORY_MAX_PAGE_SIZE = 1000
+
+# Путь к UML-диаграмме и время запуска приложения (заполняются init_app)
+uml_diagram_path = None
+STARTUP_SECONDS = None
+
+
+def init_app():
+    """
+    Подготовка приложения к запуску: отрисовка UML-диаграммы и, при TIMESEER_WARM_UP=1,
+    импорт бэкендов моделей.
+
+    Выполняется при запуске сервера (python app.py или serve.py), а не при импорте модуля:
+    рабочие процессы прогнозирования, запускаемые через forkserver, заново импортируют главный
+    модуль, и эти действия повторялись бы в каждом из них. Повторный вызов ничего не делает.
+
+    Returns:
+        Flask: Приложение.
+    """
+    global uml_diagram_path, STARTUP_SECONDS
+    if STARTUP_SECONDS is not None:
+        return app
+    # UML-диаграмма статична, поэтому отрисовывается один раз при запуске (повторно - только при изменении исходного кода)
+    with span('uml_render'):
+        uml_diagram_path = update_uml_diagram()
+    logging.info(f"UML-диаграмма: {uml_diagram_path}")
+
+    # Бэкенды моделей импортируются при первом использовании; TIMESEER_WARM_UP=1 импортирует их сразу при запуске
+    if os.environ.get('TIMESEER_WARM_UP', '0') == '1':
+        warm_up()
+
+    STARTUP_SECONDS = time.perf_counter() - _startup_started
+    logging.info(f"Время запуска приложения: {STARTUP_SECONDS:.3f} с")
+    return app
+
+
+@app.before_request
+def start_request_instrumentation():
+    """
+    Начинает измерение длительности запроса и, по запросу клиента, профилирование cProfile.
+
+    Профилирование включается заголовком X-Profile: 1 или параметром ?profile=1,
+    если задана папка для дампов TIMESEER_PROFILE_DIR.
+    """
+    g.request_started = time.perf_counter()
+    start_request_timings()
+    g.profile_stack = ExitStack()
+    profile_requested = request.headers.get('X-Profile') == '1' or request.args.get('profile') == '1'
+    g.profile_path = g.profile_stack.enter_context(
+        profile_request(request.endpoint or 'unknown', enabled=profile_requested))
+
+
+@app.after_request
+def record_request_metrics(response):
+    """
+    Записывает длительность и статус запроса в метрики, а длительности этапов - в журнал.
+    """
+    endpoint = request.endpoint or 'unknown'
+    started = g.get('request_started')
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+    REQUESTS.inc(endpoint=endpoint, status=str(response.status_code))
+    timings = finish_request_timings()
+    if timings:
+        logging.info(f"Длительность этапов {endpoint}: {format_timings(timings)}")
+    return response
+
+
+@app.teardown_request
+def stop_request_profiling(exc):
+    """
+    Завершает профилирование запроса и сохраняет дамп cProfile.
+    """
+    profile_stack = g.pop('profile_stack', None)
+    if profile_stack is not None:
+        profile_stack.close()
+        if g.get('profile_path'):
+            logging.info(f"Профиль запроса сохранён: {g.profile_path}")
+
 
 @app.route('/')
 def home():
@@ -47,151 +165,633 @@ def home():
         return f"Ошибка при загрузке главной страницы: {str(e)}", 500
 
 
-@app.route('/predict', methods=['POST'])
-def predict():
+def read_prediction_params(form):
     """
-    Обрабатывает запрос на прогнозирование.
+    Читает параметры прогнозирования из формы запроса.
+
+    Returns:
+        tuple: (столбец, модель, горизонт прогнозирования).
+
+    Raises:
+        ValueError: Если горизонт прогнозирования не число или вне диапазона.
     """
-    try:
-        logging.info("Начало обработки запроса на прогнозирование")
+    column = form['column']
+    model_type = form['model']
+    steps_ahead = int(form['steps_ahead'])
+    logging.info(f"Выбран столбец: {column}, модель: {model_type}, горизонт: {steps_ahead}")
 
-        # Загрузка данных
-        file = request.files['file']
-        file_path = 'C:\\Users\\User\\Desktop\\МИЭМ\\ВКР\\VKR\\temp_data.csv'
-        file.save(file_path)
-        data = load_data(file_path)
-        if data is None:
-            logging.error("Не удалось загрузить данные из файла: %s", file_path)
-            return "Ошибка загрузки данных: проверьте кодировку файла (рекомендуется UTF-8)", 400
+    # Проверяем горизонт прогнозирования
+    if steps_ahead < 1 or steps_ahead > 120:
+        raise ValueError("Горизонт прогнозирования должен быть от 1 до 120 месяцев")
+    return column, model_type, steps_ahead
 
-        # Получаем выбранный столбец, модель и горизонт прогнозирования из формы
-        column = request.form['column']
-        model_type = request.form['model']
-        steps_ahead = int(request.form['steps_ahead'])
-        logging.info(f"Выбран столбец: {column}, модель: {model_type}, горизонт: {steps_ahead}")
 
-        # Проверяем, существует ли столбец в данных
-        if column not in data.columns:
-            logging.error(f"Столбец {column} отсутствует в данных")
-            return f"Столбец {column} отсутствует в данных", 400
+def read_budget(form):
+    """
+    Читает необязательный срок прогнозирования (поле budget, в секундах) из формы запроса.
 
-        # Проверяем горизонт прогнозирования
-        if steps_ahead < 1 or steps_ahead > 120:
-            logging.error("Горизонт прогнозирования должен быть от 1 до 120 месяцев")
-            return "Горизонт прогнозирования должен быть от 1 до 120 месяцев", 400
-
-        # Предобработка данных
-        data, scaler = preprocess_data(data, column)
-
-        # Прогнозы с помощью разных моделей
-        forecasts = []
-        model_names = []
-        if model_type == 'all' or model_type == 'sarima':
-            sarima_pred = arima_forecast(data[column], steps_ahead)
-            if sarima_pred is not None:
-                sarima_pred = sarima_pred.to_numpy()
-                sarima_pred = scaler.inverse_transform(sarima_pred.reshape(-1, 1)).flatten()
-                forecasts.append(sarima_pred)
-                model_names.append('SARIMA')
-        if model_type == 'all' or model_type == 'prophet':
-            prophet_pred = prophet_forecast(data[column], steps_ahead)
-            if prophet_pred is not None:
-                prophet_pred = scaler.inverse_transform(prophet_pred.reshape(-1, 1)).flatten()
-                forecasts.append(prophet_pred)
-                model_names.append('Prophet')
-        if model_type == 'all' or model_type == 'holt_winters':
-            holt_winters_pred = holt_winters_forecast(data[column], steps_ahead)
-            if holt_winters_pred is not None:
-                holt_winters_pred = scaler.inverse_transform(holt_winters_pred.reshape(-1, 1)).flatten()
-                forecasts.append(holt_winters_pred)
-                model_names.append('Holt-Winters')
-
-        if not forecasts:
-            logging.error("Не удалось выполнить прогнозирование ни одной моделью")
-            return "Ошибка при выполнении прогнозирования", 500
-
-        # Создаем индекс дат для прогноза (на основе первой модели)
-        forecast_index = pd.date_range(start=data.index[-1], periods=len(forecasts[0]) + 1, freq='MS')[1:]
-        # Преобразуем прогнозы в список словарей для отображения
-        forecast_data = []
-        for i, forecast in enumerate(forecasts):
-            model_forecast = [{'date': date.strftime('%Y-%m-%d'), 'value': value, 'model': model_names[i]}
-                              for date, value in zip(forecast_index, forecast)]
-            forecast_data.extend(model_forecast)
-
-        # Валидация и кластеризация (на основе исторических данных)
-        anomalies = detect_anomalies(data[[column]])
-        clusters = cluster_data(data[[column]])
-
-        # Денормализуем исторические данные для графика и метрик
-        data_original = scaler.inverse_transform(data[[column]]).flatten()
-
-        # Обновление графика прогноза (используем первый прогноз)
-        forecast_plot_path = update_forecast_plot(forecasts[0])
-        if forecast_plot_path is None or not os.path.exists(forecast_plot_path):
-            logging.error("Не удалось сгенерировать график прогноза или файл не существует")
-            forecast_plot_url = None
-        else:
-            forecast_plot_url = "/forecast_plot.png"
-
-        # Генерация UML-диаграммы
-        uml_path = update_uml_diagram()
-        if uml_path is None or not os.path.exists(uml_path):
-            logging.error("Не удалось сгенерировать UML-диаграмму или файл не существует")
-            uml_url = None
-        else:
-            uml_url = "/uml_diagram.png"
-
-        # Визуализация
-        plot_forecast(data.index, data_original, forecasts, column, model_names)
-        # Проверяем, существует ли forecast.png
-        forecast_path = 'C:\\Users\\User\\Desktop\\МИЭМ\\ВКР\\VKR\\venv\\Scripts\\Static\\forecast.png'
-        if not os.path.exists(forecast_path):
-            logging.error("Файл forecast.png не существует")
-            forecast_url = None
-        else:
-            forecast_url = "/forecast.png"
-
-        metrics = create_metrics_table(data.index, data_original, anomalies, clusters)
-
-        # Отладка: логируем значения переменных
-        for i, (forecast, model_name) in enumerate(zip(forecasts, model_names)):
-            logging.info(f"Прогноз {model_name}: {forecast[:5]}...")
-        logging.info(f"forecast_url: {forecast_url}")
-        logging.info(f"forecast_plot_url: {forecast_plot_url}")
-        logging.info(f"uml_url: {uml_url}")
-        logging.info(f"metrics: {metrics.to_html()[:100]}...")
-
-        logging.info("Запрос на прогнозирование успешно обработан")
-
-        # Рендеринг шаблона с обработкой ошибок
-        try:
-            # Проверяем существование файла results.html
-            results_path = os.path.join(template_path, 'results.html')
-            if not os.path.exists(results_path):
-                logging.error(f"Файл results.html не найден по пути: {results_path}")
-                return f"Файл results.html не найден по пути: {results_path}", 500
+    Returns:
+        float: Срок в секундах (не больше FORECAST_BUDGET_SECONDS) или None, если поле не задано.
+
+    Raises:
+        ValueError: Если срок не число или не положителен.
+    """
+    if not form.get('budget'):
+        return None
+    budget = float(form['budget'])
+    if budget <= 0:
+        raise ValueError("Срок прогнозирования должен быть положительным числом секунд")
+    return min(budget, FORECAST_BUDGET_SECONDS)
+
+
+def run_prediction(data, column, model_type, steps_ahead, budget=None):
+    """
+    Выполняет прогнозирование, обнаружение аномалий и кластеризацию для выбранного столбца.
+
+    Args:
+        data (pd.DataFrame): Загруженные данные с индексом дат.
+        column (str): Столбец для анализа.
+        model_type (str): Ключ модели из FORECAST_MODELS или 'all'.
+        steps_ahead (int): Горизонт прогнозирования.
+        budget (float): Срок прогнозирования в секундах (по умолчанию FORECAST_BUDGET_SECONDS).
+
+    Returns:
+        dict: Прогнозы, исторические данные, метки аномалий и кластеров.
 
-            logging.info("Попытка рендеринга results.html")
+    Raises:
+        ValueError: Если столбец отсутствует в данных.
+        RuntimeError: Если ни одна модель не построила прогноз.
+    """
+    # Проверяем, существует ли столбец в данных
+    if column not in data.columns:
+        raise ValueError(f"Столбец {column} отсутствует в данных")
+
+    # Приём ряда: частота, уровень пирамиды агрегации для обучения и длина сезона
+    ingested = prepare_series(data[column])
+    freq, season_length = ingested['freq'], ingested['season_length']
+
+    # Предобработка только выбранного ряда; исходные значения сохраняются рядом с нормализованными
+    series, original, scaler = preprocess_series(ingested['series'].to_frame(column), column)
+
+    # Прогнозы с помощью разных моделей (обучаются параллельно в пуле процессов)
+    forecasts = []
+    model_names = []
+    errors = {}
+    model_seconds = {}
+    model_status = {}
+    if model_type == 'all':
+        model_keys = list(FORECAST_MODELS)
+    else:
+        model_keys = [model_type] if model_type in FORECAST_MODELS else []
+    with span('forecast'):
+        model_results = run_forecasts(series, steps_ahead, model_keys, budget=budget,
+                                      season_length=season_length) if model_keys else {}
+    for key, outcome in model_results.items():
+        model_seconds[outcome['name']] = outcome['seconds']
+        model_status[outcome['name']] = outcome['status']
+        if outcome['error'] is not None:
+            logging.error(f"Ошибка модели {outcome['name']}: {outcome['error']}")
+            errors[outcome['name']] = outcome['error']
+            continue
+        prediction = scaler.inverse_transform(outcome['forecast'].reshape(-1, 1)).flatten()
+        forecasts.append(prediction)
+        model_names.append(outcome['name'])
+
+    if not forecasts:
+        raise RuntimeError("Не удалось выполнить прогнозирование ни одной моделью")
+
+    # Создаем индекс дат для прогноза (на основе первой модели)
+    forecast_index = pd.date_range(start=series.index[-1], periods=len(forecasts[0]) + 1, freq=freq)[1:]
+    # Прогнозы в столбцовом виде (строки для шаблона строятся из столбцов)
+    forecast_table = forecast_columns(forecast_index, forecasts, model_names)
+    forecast_data = pd.DataFrame(forecast_table).to_dict('records')
+
+    # Валидация и кластеризация (на основе исторических данных)
+    features = series.to_frame()
+    anomalies = detect_anomalies(features)
+    clusters = cluster_data(features)
+
+    return {
+        'column': column,
+        'model_names': model_names,
+        'forecasts': forecasts,
+        'forecast_index': forecast_index,
+        'forecast_table': forecast_table,
+        'forecast_data': forecast_data,
+        'errors': errors,
+        'model_seconds': model_seconds,
+        'model_status': model_status,
+        'freq': freq,
+        'season_length': season_length,
+        'raw_freq': ingested['raw_freq'],
+        'raw_rows': ingested['raw_rows'],
+        'dates': series.index,
+        'history': original.to_numpy(dtype=float),
+        'anomalies': anomalies,
+        'clusters': clusters,
+    }
+
+
+def store_prediction(prediction):
+    """
+    Сохраняет результат прогнозирования для построения графиков по запросу.
+
+    Returns:
+        str: Идентификатор результата.
+    """
+    result_id = uuid.uuid4().hex
+    result_store.put(result_id, prediction)
+    return result_id
+
+
+def chart_urls(result_id):
+    """
+    Адреса графиков и данных результата прогнозирования.
+    """
+    return {
+        'forecast_url': f"/charts/{result_id}/forecast.png",
+        'forecast_plot_url': f"/charts/{result_id}/forecast_plot.png",
+        'results_url': f"/results/{result_id}",
+        'history_url': f"/results/{result_id}/history",
+    }
+
+
+def render_prediction(file_path, upload_hash, filename, column, model_type, steps_ahead, budget=None):
+    """
+    Полная обработка запроса на прогнозирование: загрузка, прогноз и страница результатов.
+
+    Returns:
+        CachedResponse: Ответ (идентификатор результата - в meta['result_id']).
+    """
+    # Загрузка данных (только столбец даты и выбранный столбец); разобранная таблица берётся из кэша по хэшу файла
+    data = load_upload(file_path, upload_hash, columns=[column])
+    if data is None:
+        logging.error("Не удалось загрузить данные из файла: %s", filename)
+        return CachedResponse("Ошибка загрузки данных: проверьте кодировку файла (рекомендуется UTF-8)", 400)
+
+    try:
+        prediction = run_prediction(data, column, model_type, steps_ahead, budget)
+    except ValueError as e:
+        logging.error(str(e))
+        return CachedResponse(str(e), 400)
+    except RuntimeError as e:
+        logging.error(str(e))
+        return CachedResponse("Ошибка при выполнении прогнозирования", 500)
+
+    model_names = prediction['model_names']
+    forecast_data = prediction['forecast_data']
+
+    # Графики строятся по запросу браузера, а не на пути обработки /predict
+    result_id = store_prediction(prediction)
+    urls = chart_urls(result_id)
+    forecast_url = urls['forecast_url']
+    forecast_plot_url = urls['forecast_plot_url']
+
+    # UML-диаграмма отрисована при запуске приложения (init_app)
+    uml_path = uml_diagram_path
+    if uml_path is None or not os.path.exists(uml_path):
+        logging.error("Не удалось сгенерировать UML-диаграмму или файл не существует")
+        uml_url = None
+    else:
+        uml_url = "/uml_diagram.png"
+
+    # В шаблон выводится только первая страница таблицы; остальные страницы
+    # запрашиваются по history_url
+    with span('metrics_table'):
+        metrics, history_pages = history_page(prediction['dates'], prediction['history'],
+                                              prediction['anomalies'], prediction['clusters'],
+                                              page=1, page_size=HISTORY_PAGE_SIZE)
+        metrics_html = metrics.to_html()
+
+    # Отладка: логируем значения переменных (краткие поля вместо HTML-таблицы)
+    for model_name, outcome_seconds in prediction['model_seconds'].items():
+        logging.info(f"Модель {model_name}: status={prediction['model_status'][model_name]} "
+                     f"seconds={outcome_seconds}")
+    anomalies = prediction['anomalies']
+    logging.info(f"result_id={result_id} rows={len(prediction['history'])} models={','.join(model_names)} "
+                 f"anomalies={int((anomalies == -1).sum()) if anomalies is not None else None} "
+                 f"uml={uml_url is not None}")
+
+    logging.info("Запрос на прогнозирование успешно обработан")
+
+    # Рендеринг шаблона с обработкой ошибок
+    try:
+        # Проверяем существование файла results.html
+        results_path = os.path.join(template_path, 'results.html')
+        if not os.path.exists(results_path):
+            logging.error(f"Файл results.html не найден по пути: {results_path}")
+            return CachedResponse(f"Файл results.html не найден по пути: {results_path}", 500)
+
+        logging.info("Попытка рендеринга results.html")
+        with span('render_template'):
             result = render_template('results.html',
                                      forecast_data=forecast_data,
                                      forecast_url=forecast_url,
                                      forecast_plot_url=forecast_plot_url,
                                      uml_url=uml_url,
-                                     metrics=metrics.to_html(),
+                                     metrics=metrics_html,
                                      column_name=column,
-                                     model_names=model_names)
-            logging.info("Шаблон results.html успешно отрендерен")
-            return result
-        except Exception as e:
-            logging.error(f"Ошибка при рендеринге results.html: {str(e)}")
-            return f"Ошибка при рендеринге results.html: {str(e)}", 500
+                                     model_names=model_names,
+                                     result_id=result_id,
+                                     results_url=urls['results_url'],
+                                     history_url=urls['history_url'],
+                                     history_pages=history_pages)
+        logging.info("Шаблон результатов успешно отрендерен")
+        return CachedResponse(result, meta={'result_id': result_id})
+    except Exception as e:
+        logging.error(f"Ошибка при рендеринге results.html: {str(e)}")
+        return CachedResponse(f"Ошибка при рендеринге results.html: {str(e)}", 500)
+
+
+def cached_http_response(entry, source):
+    """
+    HTTP-ответ из сохранённого ответа: ETag для успешных ответов и 304, если ETag совпадает
+    с If-None-Match запроса.
+    """
+    if entry.status == 200 and request.if_none_match.contains(entry.etag):
+        response = Response(status=304)
+    else:
+        response = Response(entry.body, status=entry.status, mimetype=entry.mimetype)
+    if entry.status == 200:
+        response.set_etag(entry.etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+    response.headers['X-Cache'] = source.upper()
+    return response
+
+
+@app.route('/predict', methods=['POST'])
+def predict():
+    """
+    Обрабатывает запрос на прогнозирование.
+
+    Ответы кэшируются по хэшу загруженного файла, параметрам формы и настройкам моделей
+    (ai_module.forecast_settings, включая поколение кэша моделей): повторный запрос с тем же
+    файлом и параметрами получает сохранённую страницу (или 304 при совпадении If-None-Match),
+    одновременные одинаковые запросы выполняют обработку один раз. Заголовок Cache-Control: no-cache
+    запроса заставляет пересчитать ответ целиком: CSV разбирается и модели обучаются заново,
+    без чтения кэшей наборов данных и моделей. Источник ответа - в заголовке X-Cache
+    (HIT, MISS или SHARED).
+    """
+    try:
+        logging.info("Начало обработки запроса на прогнозирование")
+
+        # Получаем выбранный столбец, модель и горизонт прогнозирования из формы
+        try:
+            column, model_type, steps_ahead = read_prediction_params(request.form)
+            budget = read_budget(request.form)
+            if 'file' not in request.files:
+                raise ValueError("Не загружен файл (поле file)")
+        except ValueError as e:
+            logging.error(str(e))
+            return str(e), 400
+
+        # Файл сохраняется во временную папку запроса; его хэш - часть ключа кэша ответов
+        file = request.files['file']
+        with tempfile.TemporaryDirectory(prefix='timeseer_request_') as scratch_dir:
+            file_path = os.path.join(scratch_dir, 'upload.csv')
+            upload_hash = save_upload(file.stream, file_path)
+
+            def compute():
+                return render_prediction(file_path, upload_hash, file.filename, column, model_type, steps_ahead,
+                                         budget)
+
+            if not RESPONSE_CACHE_ENABLED:
+                with cache_refresh(bool(request.cache_control.no_cache)):
+                    return cached_http_response(compute(), 'miss')
+            key = response_key(upload_hash, column=column, model=model_type, steps_ahead=steps_ahead, budget=budget,
+                               settings=forecast_settings())
+            refresh = bool(request.cache_control.no_cache)
+            with cache_refresh(refresh):
+                entry, source = response_cache.get_or_compute(key, compute, refresh)
+            # Страница ссылается на результат в result_store; если он вытеснен, ответ пересчитывается
+            if source == 'hit' and entry.meta.get('result_id') not in result_store:
+                response_cache.invalidate(key)
+                entry, source = response_cache.get_or_compute(key, compute, refresh=True)
+        logging.info(f"Ответ /predict: {source}")
+        return cached_http_response(entry, source)
 
     except Exception as e:
         logging.error("Произошла ошибка: %s", str(e))
         return f"Произошла ошибка: {str(e)}", 500
 
 
+@app.route('/predict/cache', methods=['DELETE'])
+def clear_response_cache():
+    """
+    Очищает кэш ответов /predict (например, после обновления моделей или данных).
+    """
+    removed = response_cache.clear()
+    logging.info(f"Кэш ответов очищен: {removed}")
+    return jsonify({'removed': removed})
+
+
+def prediction_to_json(prediction):
+    """
+    Преобразует результат run_prediction в словарь, пригодный для JSON.
+    """
+    anomalies = prediction['anomalies']
+    clusters = prediction['clusters']
+    return {
+        'column': prediction['column'],
+        'model_names': prediction['model_names'],
+        'forecast': prediction['forecast_table'],
+        'errors': prediction['errors'],
+        'model_status': prediction['model_status'],
+        'freq': prediction['freq'],
+        'season_length': prediction['season_length'],
+        'history': {
+            'dates': format_dates(prediction['dates']).tolist(),
+            'values': prediction['history'].tolist(),
+            'anomalies': anomalies.tolist() if anomalies is not None else None,
+            'clusters': clusters.tolist() if clusters is not None else None,
+        },
+    }
+
+
+def prediction_job(scratch_dir, upload_hash, column, model_type, steps_ahead, budget=None):
+    """
+    Фоновое задание прогнозирования: загружает данные из временной папки задания и строит прогноз.
+    """
+    try:
+        data = load_upload(os.path.join(scratch_dir, 'upload.csv'), upload_hash, columns=[column])
+        if data is None:
+            raise ValueError("Ошибка загрузки данных: проверьте кодировку файла (рекомендуется UTF-8)")
+        prediction = run_prediction(data, column, model_type, steps_ahead, budget)
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+    result_id = store_prediction(prediction)
+    return dict(prediction_to_json(prediction), result_id=result_id, **chart_urls(result_id))
+
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Ставит прогнозирование в очередь фоновых заданий и сразу возвращает идентификатор задания.
+    """
+    try:
+        column, model_type, steps_ahead = read_prediction_params(request.form)
+        budget = read_budget(request.form)
+        if 'file' not in request.files:
+            raise ValueError("Не загружен файл (поле file)")
+    except (KeyError, ValueError) as e:
+        logging.error(f"Некорректные параметры задания: {str(e)}")
+        return jsonify({'error': f"Некорректные параметры: {str(e)}"}), 400
+
+    # Каждое задание получает собственную временную папку с копией загруженного файла
+    scratch_dir = tempfile.mkdtemp(prefix='timeseer_job_')
+    upload_hash = save_upload(request.files['file'].stream, os.path.join(scratch_dir, 'upload.csv'))
+    try:
+        job_id = job_queue.submit(prediction_job, scratch_dir, upload_hash, column, model_type, steps_ahead, budget)
+    except QueueFullError as e:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+        logging.error(str(e))
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
+
+    logging.info(f"Задание {job_id} поставлено в очередь")
+    return jsonify({'job_id': job_id, 'status_url': f"/jobs/{job_id}",
+                    'result_url': f"/jobs/{job_id}/result"}), 202
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """
+    Возвращает статус фонового задания.
+    """
+    status = job_queue.status(job_id)
+    if status is None:
+        return jsonify({'error': f"Задание {job_id} не найдено"}), 404
+    return jsonify(status)
+
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """
+    Возвращает результат фонового задания, если оно завершено.
+    """
+    status, result = job_queue.result(job_id)
+    if status is None:
+        return jsonify({'error': f"Задание {job_id} не найдено"}), 404
+    if status == DONE:
+        return jsonify(result)
+    if status in (FAILED, CANCELLED):
+        return jsonify(job_queue.status(job_id)), 409
+    return jsonify({'id': job_id, 'status': status}), 202
+
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """
+    Отменяет фоновое задание (для выполняющегося задания - без гарантии, см. JobQueue.cancel).
+    """
+    if not job_queue.cancel(job_id):
+        return jsonify({'error': f"Задание {job_id} не найдено или уже завершено"}), 404
+    logging.info(f"Задание {job_id} отменено")
+    return jsonify(job_queue.status(job_id))
+
+
+@app.route('/batch', methods=['POST'])
+def batch_forecast():
+    """
+    Пакетный прогноз нескольких файлов (поле files) и столбцов (поле columns через запятую,
+    по умолчанию все числовые) выбранной моделью или всеми моделями.
+
+    Ответ передаётся потоком в формате NDJSON: строка на каждую задачу (ряд, модель)
+    по мере её завершения.
+    """
+    files = request.files.getlist('files')
+    model_type = request.form.get('model', 'all')
+    try:
+        steps_ahead = int(request.form.get('steps_ahead', 12))
+        if steps_ahead < 1 or steps_ahead > 120:
+            raise ValueError("Горизонт прогнозирования должен быть от 1 до 120 шагов")
+        if not files:
+            raise ValueError("Не загружено ни одного файла")
+        if model_type != 'all' and model_type not in FORECAST_MODELS:
+            raise ValueError(f"Неизвестная модель {model_type}")
+    except ValueError as e:
+        logging.error(f"Некорректные параметры пакета: {str(e)}")
+        return jsonify({'error': f"Некорректные параметры: {str(e)}"}), 400
+    columns = [c.strip() for c in request.form.get('columns', '').split(',') if c.strip()] or None
+    model_keys = None if model_type == 'all' else [model_type]
+
+    # Файлы сохраняются во временную папку, которая удаляется после передачи последней строки
+    scratch_dir = tempfile.mkdtemp(prefix='timeseer_batch_')
+    sources = []
+    for index, file in enumerate(files):
+        path = os.path.join(scratch_dir, f"upload_{index}.csv")
+        sources.append((file.filename or f"file_{index}", path, save_upload(file.stream, path)))
+    logging.info(f"Пакетный прогноз: файлов {len(sources)}, столбцы {columns or 'все числовые'}")
+
+    def generate():
+        try:
+            for record in run_batch(sources, columns, model_keys, steps_ahead):
+                yield json.dumps(record, ensure_ascii=False) + '\n'
+        finally:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+def results_columns(prediction):
+    """
+    Сводка результата прогнозирования в столбцовом виде: прогнозы, аномальные точки и размеры кластеров.
+
+    Исторические данные целиком не включаются - они отдаются постранично.
+    """
+    dates = prediction['dates']
+    anomalies = prediction['anomalies']
+    clusters = prediction['clusters']
+    result = {
+        'column': prediction['column'],
+        'model_names': prediction['model_names'],
+        'errors': prediction['errors'],
+        'model_status': prediction['model_status'],
+        'freq': prediction['freq'],
+        'season_length': prediction['season_length'],
+        'forecast': prediction['forecast_table'],
+        'history_rows': len(prediction['history']),
+        'anomalies': None,
+        'clusters': None,
+    }
+    if anomalies is not None:
+        mask = anomalies == -1
+        result['anomalies'] = {'date': format_dates(dates[mask]).tolist(),
+                               'value': prediction['history'][mask].tolist()}
+    if clusters is not None:
+        labels, counts = np.unique(clusters, return_counts=True)
+        result['clusters'] = {'cluster': labels.tolist(), 'count': counts.tolist()}
+    return result
+
+
+@app.route('/results/<result_id>')
+def results(result_id):
+    """
+    Результат прогнозирования в формате JSON (по умолчанию) или Arrow IPC (?format=arrow, только прогноз).
+    """
+    prediction = result_store.get(result_id)
+    if prediction is None:
+        return jsonify({'error': f"Результат {result_id} не найден"}), 404
+    if request.args.get('format') == 'arrow':
+        return app.response_class(to_arrow_ipc(prediction['forecast_table']),
+                                  mimetype='application/vnd.apache.arrow.stream')
+    return jsonify(dict(results_columns(prediction), history_url=chart_urls(result_id)['history_url']))
+
+
+@app.route('/results/<result_id>/history')
+def results_history(result_id):
+    """
+    Страница таблицы исторических данных с метками аномалий и кластеров.
+
+    Параметры: page (с 1), page_size и format (json, arrow или html).
+    """
+    prediction = result_store.get(result_id)
+    if prediction is None:
+        return jsonify({'error': f"Результат {result_id} не найден"}), 404
+    try:
+        page = int(request.args.get('page', 1))
+        page_size = int(request.args.get('page_size', HISTORY_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': "Параметры page и page_size должны быть целыми числами"}), 400
+    if page < 1 or not 1 <= page_size <= HISTORY_MAX_PAGE_SIZE:
+        return jsonify({'error': f"page должен быть не меньше 1, page_size - от 1 до {HISTORY_MAX_PAGE_SIZE}"}), 400
+    fmt = request.args.get('format', 'json')
+    if fmt not in ('json', 'arrow', 'html'):
+        return jsonify({'error': f"Неизвестный формат: {fmt}"}), 400
+
+    table, total_pages = history_page(prediction['dates'], prediction['history'],
+                                      prediction['anomalies'], prediction['clusters'], page, page_size)
+    if fmt == 'html':
+        return table.to_html()
+    columns = {'date': format_dates(table['Дата']).tolist(), 'value': table['Значение'].tolist()}
+    for name, label in (('anomaly', 'Аномалия'), ('cluster', 'Кластер')):
+        if label in table:
+            columns[name] = table[label].tolist()
+    if fmt == 'arrow':
+        return app.response_class(to_arrow_ipc(columns), mimetype='application/vnd.apache.arrow.stream',
+                                  headers={'X-Total-Pages': str(total_pages)})
+    return jsonify({'page': min(page, total_pages), 'page_size': page_size, 'total_pages': total_pages,
+                    'total_rows': len(prediction['history']), 'columns': columns})
+
+
+def build_chart(prediction, chart, fmt):
+    """
+    Строит график результата прогнозирования в заданном формате.
+
+    Returns:
+        tuple: (содержимое, MIME-тип).
+    """
+    if chart == 'forecast':
+        if fmt == 'json':
+            return forecast_series(prediction['dates'], prediction['history'], prediction['forecasts'],
+                                   prediction['model_names'], prediction['forecast_index']), 'application/json'
+        fig = build_forecast_figure(prediction['dates'], prediction['history'], prediction['forecasts'],
+                                    prediction['column'], prediction['model_names'],
+                                    forecast_dates=prediction['forecast_index'])
+    else:
+        # График первого прогноза по шагам
+        if fmt == 'json':
+            return {'model': prediction['model_names'][0],
+                    'values': [float(v) for v in prediction['forecasts'][0]]}, 'application/json'
+        fig = build_forecast_plot_figure(prediction['forecasts'][0])
+    return render_figure(fig, fmt), CHART_FORMATS[fmt]
+
+
+@app.route('/charts/<result_id>/<chart>.<fmt>')
+def chart(result_id, chart, fmt):
+    """
+    Отдаёт график результата прогнозирования в формате PNG, SVG или JSON.
+
+    График строится при первом запросе и кэшируется по идентификатору результата.
+    """
+    if chart not in ('forecast', 'forecast_plot') or (fmt not in CHART_FORMATS and fmt != 'json'):
+        return f"Неизвестный график: {chart}.{fmt}", 404
+    prediction = result_store.get(result_id)
+    if prediction is None:
+        return f"Результат {result_id} не найден", 404
+
+    key = (result_id, chart, fmt)
+    cached = chart_cache.get(key)
+    if cached is None:
+        # Блокировка по ключу не даёт одновременным запросам строить один и тот же график дважды
+        with _chart_lock:
+            key_lock = _chart_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            cached = chart_cache.get(key)
+            if cached is None:
+                try:
+                    with span(f'chart_{chart}_{fmt}'):
+                        cached = build_chart(prediction, chart, fmt)
+                    # График попадает в кэш до снятия блокировки, иначе запрос, пришедший
+                    # между ними, создаст новую блокировку и построит график заново
+                    chart_cache.put(key, cached)
+                except Exception as e:
+                    logging.error(f"Ошибка при построении графика {chart}.{fmt}: {str(e)}")
+                    return f"Ошибка при построении графика: {str(e)}", 500
+                finally:
+                    with _chart_lock:
+                        _chart_locks.pop(key, None)
+    body, mimetype = cached
+    if mimetype == 'application/json':
+        return jsonify(body)
+    return app.response_class(body, mimetype=mimetype)
+
+
+@app.route('/startup-time')
+def startup_time():
+    """
+    Возвращает время запуска приложения и время импорта загруженных бэкендов моделей.
+    """
+    return jsonify({'startup_seconds': STARTUP_SECONDS, 'backend_import_seconds': backend_import_seconds})
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """
+    Метрики приложения в текстовом формате Prometheus.
+    """
+    return app.response_class(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
 # Тестовый маршрут для проверки шаблона
 @app.route('/test-template')
 def test_template():
@@ -237,4 +837,5 @@ def check_static():
 
 
 if __name__ == '__main__':
+    init_app()
     app.run(debug=True)
@@ -0,0 +1,236 @@
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import model_cache
+from ai_module import FORECAST_MODELS, warm_up
+from data_processing import load_data
+from synthetic import make_synthetic_series
+
+
+def mae(actual, predicted):
+    """
+    Средняя абсолютная ошибка.
+    """
+    return float(np.mean(np.abs(actual - predicted)))
+
+
+def mape(actual, predicted):
+    """
+    Средняя абсолютная процентная ошибка (наблюдения с нулевым значением не учитываются).
+    """
+    mask = actual != 0
+    if not mask.any():
+        return float('nan')
+    return float(np.mean(np.abs((actual[mask] - predicted[mask]) / actual[mask])) * 100)
+
+
+def smape(actual, predicted):
+    """
+    Симметричная средняя абсолютная процентная ошибка.
+    """
+    denominator = np.abs(actual) + np.abs(predicted)
+    mask = denominator != 0
+    if not mask.any():
+        return 0.0
+    return float(np.mean(2 * np.abs(actual[mask] - predicted[mask]) / denominator[mask]) * 100)
+
+
+def rolling_origins(n_obs, horizon, n_cutoffs, min_train):
+    """
+    Точки отсечения для оценки со скользящим началом прогноза.
+
+    Args:
+        n_obs (int): Длина ряда.
+        horizon (int): Горизонт прогноза.
+        n_cutoffs (int): Число точек отсечения.
+        min_train (int): Наименьшая длина обучающей выборки.
+
+    Returns:
+        list: Длины обучающих выборок (по возрастанию).
+    """
+    last = n_obs - horizon
+    if last < min_train:
+        raise ValueError(f"Ряд слишком короткий: нужно хотя бы {min_train + horizon} наблюдений")
+    cutoffs = np.linspace(min_train, last, num=min(n_cutoffs, last - min_train + 1))
+    return sorted(set(int(round(c)) for c in cutoffs))
+
+
+def _init_worker():
+    # Кэш моделей на диске отключается, чтобы измерялось время обучения, а не чтения кэша,
+    # а бэкенды импортируются заранее, чтобы время импорта не попадало в замеры
+    model_cache.model_cache.directory = None
+    warm_up()
+
+
+def _peak_memory(forecast_fn, train, horizon):
+    # Отдельный прогон под tracemalloc: трассировка замедляет выделения памяти,
+    # поэтому время в нём не измеряется
+    model_cache.model_cache.clear()
+    tracemalloc.start()
+    try:
+        forecast_fn(train, horizon)
+    except Exception:
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2 ** 20
+
+
+def evaluate_origin(model_key, train, test, measure_memory=True):
+    """
+    Обучение модели на обучающей выборке и оценка прогноза на тестовой.
+
+    Выполняется в рабочем процессе. Время измеряется в прогоне без трассировки памяти,
+    а пиковая память — в отдельном прогоне под tracemalloc (выделения Python и NumPy,
+    без памяти внешних процессов, например Stan).
+
+    Args:
+        model_key (str): Ключ модели из FORECAST_MODELS.
+        train (pd.Series): Обучающая выборка.
+        test (pd.Series): Тестовая выборка.
+        measure_memory (bool): Измерять пиковую память (второй прогон модели).
+
+    Returns:
+        dict: Метрики точности, время и пиковая память.
+    """
+    name, forecast_fn = FORECAST_MODELS[model_key]
+    model_cache.model_cache.clear()
+    start = time.perf_counter()
+    try:
+        forecast = forecast_fn(train, len(test))
+        error = None if forecast is not None else f"Модель {name} не вернула прогноз"
+    except Exception as e:
+        forecast, error = None, str(e)
+    wall_seconds = time.perf_counter() - start
+    peak_memory_mb = _peak_memory(forecast_fn, train, len(test)) if measure_memory else None
+
+    row = {'model': name, 'train_size': len(train), 'horizon': len(test),
+           'wall_seconds': wall_seconds, 'peak_memory_mb': peak_memory_mb, 'error': error,
+           'mae': None, 'mape': None, 'smape': None}
+    if forecast is not None:
+        actual = test.to_numpy(dtype=float)
+        predicted = np.asarray(forecast, dtype=float)
+        row.update(mae=mae(actual, predicted), mape=mape(actual, predicted), smape=smape(actual, predicted))
+    return row
+
+
+def run_backtest(series, model_keys=None, horizon=12, n_cutoffs=5, min_train=36, max_workers=None,
+                 measure_memory=True):
+    """
+    Оценка моделей со скользящим началом прогноза; пары (модель, точка отсечения) выполняются параллельно.
+
+    Args:
+        series (pd.Series): Временной ряд.
+        model_keys (list): Ключи моделей из FORECAST_MODELS (по умолчанию все).
+        horizon (int): Горизонт прогноза.
+        n_cutoffs (int): Число точек отсечения.
+        min_train (int): Наименьшая длина обучающей выборки.
+        max_workers (int): Число процессов.
+        measure_memory (bool): Измерять пиковую память отдельным прогоном.
+
+    Returns:
+        pd.DataFrame: Результаты по каждой паре (модель, точка отсечения).
+    """
+    model_keys = model_keys or list(FORECAST_MODELS)
+    cutoffs = rolling_origins(len(series), horizon, n_cutoffs, min_train)
+    rows = []
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(evaluate_origin, key, series.iloc[:cutoff], series.iloc[cutoff:cutoff + horizon],
+                               measure_memory)
+                   for key in model_keys for cutoff in cutoffs]
+        for future in as_completed(futures):
+            rows.append(future.result())
+    return pd.DataFrame(rows).sort_values(['model', 'train_size'], ignore_index=True)
+
+
+def summarize(results):
+    """
+    Сводка результатов по моделям: средние метрики, время и наибольшая пиковая память.
+
+    Returns:
+        pd.DataFrame: Сводная таблица (строка на модель).
+    """
+    grouped = results.groupby('model')
+    summary = grouped[['mae', 'mape', 'smape']].mean()
+    summary['wall_seconds_mean'] = grouped['wall_seconds'].mean()
+    summary['wall_seconds_max'] = grouped['wall_seconds'].max()
+    summary['peak_memory_mb_max'] = grouped['peak_memory_mb'].max()
+    summary['errors'] = grouped['error'].count()
+    summary['runs'] = grouped.size()
+    return summary
+
+
+def run_benchmark(lengths, model_keys=None, horizon=12, n_cutoffs=3, max_workers=None, seed=0,
+                  measure_memory=True):
+    """
+    Воспроизводимый бенчмарк на синтетических рядах заданной длины.
+
+    Returns:
+        dict: Сведения об окружении и сводка по каждой длине ряда.
+    """
+    report = {'python': platform.python_version(), 'platform': platform.platform(),
+              'cpu_count': os.cpu_count(), 'lengths': {}}
+    for length in lengths:
+        series = make_synthetic_series(length, seed=seed)
+        start = time.perf_counter()
+        results = run_backtest(series, model_keys, horizon, n_cutoffs, min(36, length - horizon), max_workers,
+                               measure_memory)
+        summary = summarize(results)
+        report['lengths'][str(length)] = {'total_seconds': time.perf_counter() - start,
+                                          'models': json.loads(summary.to_json(orient='index'))}
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Оценка моделей прогнозирования со скользящим началом прогноза")
+    parser.add_argument('--csv', help="CSV-файл с данными (столбец date и столбец для анализа)")
+    parser.add_argument('--column', default='emissions', help="Столбец для анализа")
+    parser.add_argument('--models', nargs='*', choices=list(FORECAST_MODELS), help="Модели (по умолчанию все)")
+    parser.add_argument('--horizon', type=int, default=12, help="Горизонт прогноза")
+    parser.add_argument('--cutoffs', type=int, default=5, help="Число точек отсечения")
+    parser.add_argument('--min-train', type=int, default=36, help="Наименьшая длина обучающей выборки")
+    parser.add_argument('--workers', type=int, default=None, help="Число процессов")
+    parser.add_argument('--benchmark', type=int, nargs='*', metavar='LENGTH',
+                        help="Бенчмарк на синтетических рядах указанной длины (по умолчанию 60 120 240)")
+    parser.add_argument('--seed', type=int, default=0, help="Зерно генератора синтетических рядов")
+    parser.add_argument('--no-memory', action='store_true',
+                        help="Не измерять пиковую память (без второго прогона каждой модели)")
+    parser.add_argument('--output', help="Файл для отчёта в формате JSON")
+    args = parser.parse_args()
+
+    if args.benchmark is not None:
+        report = run_benchmark(args.benchmark or [60, 120, 240], args.models, args.horizon, args.cutoffs,
+                               args.workers, args.seed, not args.no_memory)
+    else:
+        if args.csv:
+            data = load_data(args.csv, columns=[args.column])
+            if data is None or args.column not in data.columns:
+                sys.exit(f"Не удалось загрузить столбец {args.column} из {args.csv}")
+            series = data[args.column]
+        else:
+            series = make_synthetic_series(seed=args.seed)
+        results = run_backtest(series, args.models, args.horizon, args.cutoffs, args.min_train, args.workers,
+                               not args.no_memory)
+        print(summarize(results).to_string())
+        report = {'results': json.loads(results.to_json(orient='records')),
+                  'summary': json.loads(summarize(results).to_json(orient='index'))}
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
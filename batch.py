@@ -0,0 +1,123 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_processing import load_data, load_upload, preprocess_series
+from frequency import prepare_series
+from ai_module import (FORECAST_MODELS, FORECAST_WORKERS, MODEL_BUDGET_SECONDS, MODEL_TIMEOUTS, get_worker_pool,
+                       _timed_forecast, _collect_forecast)
+from visualization import format_dates
+from workers import OK, TIMEOUT
+
+# Наибольшее число одновременно обучаемых моделей в пакетном режиме
+BATCH_WORKERS = int(os.environ.get('TIMESEER_BATCH_WORKERS', FORECAST_WORKERS))
+
+
+def load_sources(sources, columns=None):
+    """
+    Загружает каждый файл пакета один раз и выбирает ряды для прогнозирования.
+
+    Args:
+        sources (list): Кортежи (имя, путь) или (имя, путь, хэш загруженного файла); файлы
+            с хэшем загружаются через кэш наборов данных.
+        columns (list): Столбцы для прогнозирования (по умолчанию все числовые столбцы каждого файла).
+
+    Yields:
+        tuple: (имя файла, столбец, ряд pd.Series или None, текст ошибки или None).
+    """
+    for source in sources:
+        name, path = source[0], source[1]
+        upload_hash = source[2] if len(source) > 2 else None
+        if upload_hash is not None:
+            data = load_upload(path, upload_hash, columns=columns)
+        else:
+            data = load_data(path, columns=columns)
+        if data is None:
+            yield name, None, None, "Ошибка загрузки данных: проверьте кодировку файла (рекомендуется UTF-8)"
+            continue
+        numeric = data.select_dtypes(include='number').columns
+        for column in (columns if columns is not None else numeric):
+            if column not in numeric:
+                yield name, column, None, f"Столбец {column} отсутствует в файле или не числовой"
+                continue
+            yield name, column, data[column], None
+
+
+def run_batch(sources, columns=None, model_keys=None, steps_ahead=12, max_workers=None):
+    """
+    Пакетное прогнозирование всех выбранных рядов нескольких файлов всеми выбранными моделями.
+
+    Каждый файл загружается один раз, предобработка (определение частоты, агрегация,
+    нормализация) выполняется один раз на ряд и общая для всех моделей. Задачи (ряд, модель)
+    распределяются по пулу процессов, и результаты выдаются по мере завершения задач.
+    Файлы загружаются по мере запуска задач (пул берёт следующую задачу, когда запущена
+    предыдущая), поэтому первые результаты приходят до разбора всего пакета, а в памяти
+    держатся только ряды, задачи которых ещё не завершены.
+    Срок каждой задачи - срок модели из MODEL_BUDGET_SECONDS.
+
+    Args:
+        sources (list): Файлы пакета (см. load_sources).
+        columns (list): Столбцы для прогнозирования (по умолчанию все числовые).
+        model_keys (list): Ключи моделей из FORECAST_MODELS (по умолчанию все).
+        steps_ahead (int): Количество шагов вперёд для прогноза.
+        max_workers (int): Наибольшее число одновременно обучаемых моделей (по умолчанию BATCH_WORKERS).
+
+    Yields:
+        dict: Результат задачи: 'file', 'column', 'model', 'status' ('ok', 'error', 'timeout'),
+            'error', 'seconds', 'freq', 'forecast' ({'date': [...], 'value': [...]} или None).
+    """
+    model_keys = model_keys or list(FORECAST_MODELS)
+    max_workers = max_workers or BATCH_WORKERS
+    timeouts = {}
+    # Ряд -> (файл, столбец, ряд, нормализатор, частота) и число его незавершённых задач
+    prepared = {}
+    remaining = {}
+    # Ошибки загрузки, найденные при подготовке задач; выдаются вместе с результатами
+    load_errors = []
+
+    def produce_tasks():
+        for series_id, (name, column, series, error) in enumerate(load_sources(sources, columns)):
+            if error is not None:
+                load_errors.append({'file': name, 'column': column, 'model': None, 'status': 'error',
+                                    'error': error, 'seconds': None, 'freq': None, 'forecast': None})
+                continue
+            ingested = prepare_series(series)
+            scaled, _, scaler = preprocess_series(ingested['series'].to_frame(column), column)
+            # Ряды нумеруются, так как имена файлов в пакете могут совпадать
+            prepared[series_id] = (name, column, scaled, scaler, ingested['freq'])
+            remaining[series_id] = len(model_keys)
+            for key in model_keys:
+                timeouts[(series_id, key)] = MODEL_BUDGET_SECONDS.get(key)
+                yield (series_id, key), (_timed_forecast, (key, scaled, steps_ahead, ingested['season_length']))
+
+    results = get_worker_pool(max_workers).iter_run(produce_tasks(), timeouts, max_workers)
+    for (series_id, key), status, value in results:
+        while load_errors:
+            yield load_errors.pop(0)
+        name, column, scaled, scaler, freq = prepared[series_id]
+        limit = timeouts.pop((series_id, key))
+        remaining[series_id] -= 1
+        if not remaining[series_id]:
+            del prepared[series_id], remaining[series_id]
+        record = {'file': name, 'column': column, 'model': FORECAST_MODELS[key][0], 'freq': freq, 'forecast': None}
+        if status == OK:
+            outcome = _collect_forecast(key, *value)
+            record.update(status=outcome['status'], error=outcome['error'], seconds=outcome['seconds'])
+        elif status == TIMEOUT:
+            MODEL_TIMEOUTS.inc(model=key)
+            record.update(status='timeout', seconds=limit,
+                          error=f"Модель {record['model']} не уложилась в срок {limit:g} с")
+            outcome = None
+        else:
+            record.update(status='error', error=value, seconds=None)
+            outcome = None
+        if outcome is not None and outcome['forecast'] is not None:
+            values = scaler.inverse_transform(outcome['forecast'].reshape(-1, 1)).ravel()
+            dates = pd.date_range(start=scaled.index[-1], periods=len(values) + 1, freq=freq)[1:]
+            record['forecast'] = {'date': format_dates(dates).tolist(),
+                                  'value': np.asarray(values, dtype=float).tolist()}
+        yield record
+    # Ошибки файлов, после которых не было запущено ни одной задачи
+    while load_errors:
+        yield load_errors.pop(0)
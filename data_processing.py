@@ -1,43 +1,208 @@
+import os
+import codecs
 import pandas as pd
 import numpy as np
-from sklearn.preprocessing import MinMaxScaler
+from instrumentation import span
+from dataset_cache import dataset_key, get_dataset_cache
+from model_cache import refresh_requested
 
-def load_data(file_path="C:\\Users\\User\\Desktop\\МИЭМ\\ВКР\\VKR\\phosagro_data.csv"):
+# Кодировки, которые проверяются при определении кодировки файла (в порядке приоритета)
+ENCODINGS = ['utf-8', 'windows-1251', 'latin1']
+# Размер фрагмента файла для определения кодировки
+ENCODING_SAMPLE_BYTES = 64 * 1024
+# Файлы больше этого размера читаются по частям
+CHUNKED_READ_BYTES = int(os.environ.get('TIMESEER_CHUNKED_READ_BYTES', 256 * 1024 * 1024))
+# Число строк в одной части при чтении по частям
+READ_CHUNK_ROWS = 1_000_000
+# 1 - выбранный ряд после предобработки хранится в float32 (вдвое меньше памяти)
+PREPROCESS_FLOAT32 = os.environ.get('TIMESEER_PREPROCESS_FLOAT32', '0') == '1'
+
+
+def detect_encoding(file_path, sample_size=ENCODING_SAMPLE_BYTES):
+    """
+    Определяет кодировку файла по фрагменту из его начала.
+
+    Args:
+        file_path (str): Путь к файлу.
+        sample_size (int): Размер фрагмента в байтах.
+
+    Returns:
+        str: Название кодировки.
+
+    Raises:
+        UnicodeDecodeError: Если ни одна кодировка не подошла.
+    """
+    with open(file_path, 'rb') as f:
+        sample = f.read(sample_size)
+    for encoding in ENCODINGS:
+        try:
+            # Инкрементальный декодер не считает ошибкой символ, обрезанный на границе фрагмента
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    raise UnicodeDecodeError("Не удалось определить кодировку файла", b"", 0, 0, "")
+
+
+def _clean_frame(data, date_format=None):
+    """
+    Удаляет пропуски и преобразует столбец date в формат datetime.
+    """
+    data = data.dropna()
+    data['date'] = pd.to_datetime(data['date'], format=date_format, cache=True)
+    return data
+
+
+@span('load_data')
+def load_data(file_path="C:\\Users\\User\\Desktop\\МИЭМ\\ВКР\\VKR\\phosagro_data.csv", columns=None,
+              chunksize=None, date_format=None):
     """
     Загружает данные из CSV-файла и выполняет базовую очистку.
+
+    Кодировка определяется по фрагменту из начала файла (если дальше в файле встретится
+    недопустимый для неё байт, файл перечитывается со следующей кодировкой), а при заданных
+    columns загружаются только столбец date и нужные столбцы.
+
+    Args:
+        file_path (str): Путь к CSV-файлу.
+        columns (list): Столбцы для загрузки помимо date (по умолчанию все столбцы).
+        chunksize (int): Число строк в части при чтении по частям. По умолчанию файлы
+            больше CHUNKED_READ_BYTES читаются частями по READ_CHUNK_ROWS строк.
+        date_format (str): Формат дат (например, '%Y-%m-%d'); если не задан, определяется автоматически.
+
+    Returns:
+        pd.DataFrame: Данные с индексом дат или None при ошибке.
     """
     try:
-        # Попробуем разные кодировки
-        encodings = ['utf-8', 'windows-1251', 'latin1']
-        for encoding in encodings:
+        encoding = detect_encoding(file_path)
+        # Кодировка определена по началу файла; если дальше встретится недопустимый
+        # для неё байт, файл перечитывается со следующей кодировкой из ENCODINGS
+        candidates = ENCODINGS[ENCODINGS.index(encoding):]
+        for i, encoding in enumerate(candidates):
             try:
-                data = pd.read_csv(file_path, encoding=encoding)
-                print(f"Файл успешно прочитан с кодировкой: {encoding}")
+                data = _read_frame(file_path, encoding, columns, chunksize, date_format)
                 break
             except UnicodeDecodeError:
-                continue
-        else:
-            raise UnicodeDecodeError("Не удалось определить кодировку файла", "", 0, "", "")
+                if i == len(candidates) - 1:
+                    raise
+                print(f"Файл не читается с кодировкой {encoding}, пробуем {candidates[i + 1]}")
+        print(f"Файл успешно прочитан с кодировкой: {encoding}")
 
-        # Удаление пропусков
-        data = data.dropna()
         # Удаление дубликатов
         data = data.drop_duplicates()
-        # Преобразование столбца date в формат datetime
-        data['date'] = pd.to_datetime(data['date'])
         data.set_index('date', inplace=True)
         return data
     except Exception as e:
         print(f"Ошибка при загрузке данных: {e}")
         return None
 
-def preprocess_data(data, column):
+
+def _read_frame(file_path, encoding, columns=None, chunksize=None, date_format=None):
     """
-    Нормализует данные для указанного столбца.
+    Читает CSV-файл в заданной кодировке и очищает его (см. load_data).
+    """
+    read_kwargs = {'encoding': encoding}
+    if columns is not None:
+        # Читаем только заголовок, чтобы не запрашивать отсутствующие столбцы
+        header = pd.read_csv(file_path, encoding=encoding, nrows=0).columns
+        missing = [c for c in columns if c not in header]
+        if missing:
+            print(f"Столбцы отсутствуют в файле: {missing}")
+        value_columns = [c for c in columns if c in header and c != 'date']
+        read_kwargs['usecols'] = ['date'] + value_columns
+        read_kwargs['dtype'] = {c: 'float64' for c in value_columns}
+
+    if chunksize is None and os.path.getsize(file_path) > CHUNKED_READ_BYTES:
+        chunksize = READ_CHUNK_ROWS
+
+    if chunksize:
+        # Части очищаются по мере чтения, в памяти остаются только нужные столбцы
+        chunks = pd.read_csv(file_path, chunksize=chunksize, **read_kwargs)
+        return pd.concat([_clean_frame(chunk, date_format) for chunk in chunks], ignore_index=True)
+    return _clean_frame(pd.read_csv(file_path, **read_kwargs), date_format)
+
+@span('load_upload')
+def load_upload(file_path, upload_hash, columns=None, date_format=None, cache=None):
+    """
+    Загружает данные загруженного файла, используя кэш разобранных наборов данных.
+
+    Очищенная таблица сохраняется в кэше по хэшу файла и параметрам разбора, поэтому
+    повторная загрузка того же файла не разбирает CSV заново (кроме пересчёта внутри
+    model_cache.cache_refresh()).
+
+    Args:
+        file_path (str): Путь к сохранённому файлу.
+        upload_hash (str): Хэш содержимого файла (см. dataset_cache.save_upload).
+        columns (list): Столбцы для загрузки помимо date.
+        date_format (str): Формат дат.
+        cache (DatasetCache): Кэш наборов данных (по умолчанию общий кэш процесса).
+
+    Returns:
+        pd.DataFrame: Данные с индексом дат или None при ошибке.
+    """
+    cache = cache if cache is not None else get_dataset_cache()
+    key = dataset_key(upload_hash, columns, date_format)
+    data = None if refresh_requested() else cache.get(key)
+    if data is not None:
+        return data
+    data = load_data(file_path, columns=columns, date_format=date_format)
+    if data is not None:
+        cache.put(key, data)
+    return data
+
+
+def prepare_time_series(data, column, timesteps):
+    """
+    Формирование обучающих окон для LSTM: окно из timesteps значений и следующее значение.
+
+    Окна строятся без циклов как представления (sliding_window_view) над значениями столбца,
+    без копирования данных.
+
+    Args:
+        data (pd.DataFrame): Данные.
+        column (str): Столбец для анализа.
+        timesteps (int): Длина окна.
+
+    Returns:
+        tuple: (X формы (n_windows, timesteps, 1), y формы (n_windows,)).
+    """
+    values = np.ascontiguousarray(data[column].to_numpy(dtype=np.float32))
+    if len(values) <= timesteps:
+        raise ValueError(f"Ряд слишком короткий для окна длины {timesteps}")
+    windows = np.lib.stride_tricks.sliding_window_view(values, timesteps + 1)
+    return windows[:, :timesteps, np.newaxis], windows[:, timesteps]
+
+
+@span('preprocess_data')
+def preprocess_series(data, column, dtype=None):
+    """
+    Нормализует только выбранный столбец, не изменяя и не копируя исходную таблицу.
+
+    Args:
+        data (pd.DataFrame): Данные с индексом дат.
+        column (str): Столбец для анализа.
+        dtype: Тип значений нормализованного ряда (по умолчанию float32 при PREPROCESS_FLOAT32, иначе float64).
+
+    Returns:
+        tuple: (нормализованный ряд pd.Series, исходный ряд pd.Series, обученный MinMaxScaler).
     """
+    # sklearn импортируется при первом вызове, чтобы не замедлять запуск приложения
+    from sklearn.preprocessing import MinMaxScaler
+
+    dtype = dtype or (np.float32 if PREPROCESS_FLOAT32 else np.float64)
+    original = data[column]
+    values = original.to_numpy(dtype=dtype)
     scaler = MinMaxScaler()
-    data[[column]] = scaler.fit_transform(data[[column]])
-    return data, scaler
+    scaled = scaler.fit_transform(values.reshape(-1, 1)).ravel()
+    return pd.Series(scaled, index=data.index, name=column), original, scaler
 
-    print(f"Индекс после загрузки: {data.index}")
-    print(f"Частота индекса: {data.index.freq}")
+
+def preprocess_data(data, column):
+    """
+    Нормализует данные для указанного столбца.
+
+    Returns:
+        tuple: (таблица из одного нормализованного столбца, обученный MinMaxScaler).
+    """
+    scaled, _, scaler = preprocess_series(data, column)
+    return scaled.to_frame(), scaler
@@ -0,0 +1,164 @@
+import os
+import hashlib
+import tempfile
+import threading
+
+import pandas as pd
+
+from shared_store import get_shared_store
+
+# Папка кэша разобранных наборов данных
+DATASET_CACHE_DIR = os.environ.get('TIMESEER_DATASET_CACHE_DIR',
+                                   os.path.join(tempfile.gettempdir(), 'timeseer_datasets'))
+# Наибольший суммарный размер файлов кэша в байтах
+DATASET_CACHE_BYTES = int(os.environ.get('TIMESEER_DATASET_CACHE_BYTES', 1024 * 1024 * 1024))
+# Размер блока при сохранении и хэшировании загруженного файла
+UPLOAD_BLOCK_BYTES = 1024 * 1024
+
+
+def save_upload(stream, path):
+    """
+    Сохраняет загруженный файл по частям и одновременно вычисляет его хэш.
+
+    Args:
+        stream: Файловый объект загрузки (например, request.files['file'].stream).
+        path (str): Путь для сохранения.
+
+    Returns:
+        str: Шестнадцатеричный SHA-256 хэш содержимого.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'wb') as f:
+        while True:
+            block = stream.read(UPLOAD_BLOCK_BYTES)
+            if not block:
+                break
+            digest.update(block)
+            f.write(block)
+    return digest.hexdigest()
+
+
+def dataset_key(upload_hash, columns=None, date_format=None):
+    """
+    Ключ набора данных: хэш файла и параметры разбора, от которых зависит очищенная таблица.
+    """
+    raw = f"{upload_hash}|{sorted(columns) if columns is not None else None}|{date_format}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class DatasetCache:
+    """
+    Дисковый кэш очищенных таблиц с индексом дат.
+
+    Таблицы хранятся в формате Feather (Arrow IPC) без сжатия и читаются через отображение
+    файла в память; если pyarrow не установлен, используется pickle. Когда суммарный размер
+    файлов превышает max_bytes, удаляются файлы, к которым дольше всего не обращались.
+    Если задано хранилище в общей памяти, таблицы публикуются и в нём, и рабочие процессы
+    сервера читают одну копию без разбора файла.
+    """
+
+    def __init__(self, directory=DATASET_CACHE_DIR, max_bytes=DATASET_CACHE_BYTES, shared=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.shared = shared
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        try:
+            import pyarrow.feather  # noqa: F401
+            self.extension = 'feather'
+        except ImportError:
+            self.extension = 'pkl'
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.{self.extension}")
+
+    def get(self, key):
+        """
+        Возвращает таблицу по ключу или None, если её нет в кэше.
+        """
+        if self.shared is not None:
+            data = self.shared.get(f"dataset|{key}")
+            if data is not None:
+                return data
+        path = self._path(key)
+        try:
+            if self.extension == 'feather':
+                from pyarrow import feather
+                table = feather.read_table(path, memory_map=True)
+                # split_blocks позволяет не копировать числовые столбцы из отображённого файла
+                data = table.to_pandas(split_blocks=True)
+            else:
+                data = pd.read_pickle(path)
+            # Время изменения служит отметкой последнего обращения для вытеснения
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Ошибка чтения кэша данных {path}: {str(e)}")
+            return None
+        if self.shared is not None:
+            self.shared.put(f"dataset|{key}", data)
+        return data
+
+    def put(self, key, data):
+        """
+        Сохраняет таблицу и вытесняет старые файлы при превышении размера кэша.
+        """
+        if self.shared is not None:
+            self.shared.put(f"dataset|{key}", data)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            if self.extension == 'feather':
+                import pyarrow as pa
+                from pyarrow import feather
+                table = pa.Table.from_pandas(data, preserve_index=True)
+                feather.write_feather(table, tmp_path, compression='uncompressed')
+            else:
+                data.to_pickle(tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Ошибка записи кэша данных {path}: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        """
+        Удаляет файлы, к которым дольше всего не обращались, пока размер кэша больше max_bytes.
+        """
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and not entry.name.endswith('.tmp'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    # Файл может быть открыт другим процессом (например, отображён в память в Windows)
+                    continue
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+
+_dataset_cache = None
+_dataset_cache_lock = threading.Lock()
+
+
+def get_dataset_cache():
+    """
+    Общий кэш наборов данных процесса (создаётся при первом обращении).
+    """
+    global _dataset_cache
+    with _dataset_cache_lock:
+        if _dataset_cache is None:
+            _dataset_cache = DatasetCache(shared=get_shared_store())
+        return _dataset_cache
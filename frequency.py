@@ -0,0 +1,207 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import span
+
+# Наибольшее число точек ряда, на котором обучаются модели; более длинные ряды агрегируются
+MAX_FIT_POINTS = int(os.environ.get('TIMESEER_MAX_FIT_POINTS', 2000))
+# Наибольшая длина сезона, которую ищет периодограмма
+MAX_SEASON_LENGTH = int(os.environ.get('TIMESEER_MAX_SEASON_LENGTH', 60))
+# Наименьшая автокорреляция на найденном периоде, при которой он принимается как сезон
+SEASONALITY_MIN_ACF = 0.3
+# Число первых точек индекса, по которым определяется частота
+FREQUENCY_SAMPLE = 1000
+
+# Уровни пирамиды агрегации (от мелкого к крупному) и их номинальная длительность в секундах
+PYRAMID_LEVELS = {'min': 60, 'h': 3600, 'D': 86400, 'W': 7 * 86400, 'MS': 30.44 * 86400}
+# Уровень, из которого агрегируется каждый уровень пирамиды (недели не вкладываются в месяцы)
+_PARENT_LEVEL = {'h': 'min', 'D': 'h', 'W': 'D', 'MS': 'D'}
+# Длина сезона по умолчанию для частот, у которых периодограмма не нашла сезонности
+DEFAULT_SEASON_LENGTHS = {'min': 60, 'h': 24, 'D': 7, 'W': 52, 'MS': 12, 'QS': 4, 'YS': 1}
+
+
+def freq_seconds(freq):
+    """
+    Длительность шага частоты в секундах (для месяцев - длина января), None для неизвестной частоты.
+    """
+    anchor = pd.Timestamp('2001-01-01')
+    try:
+        offset = pd.tseries.frequencies.to_offset(freq)
+    except ValueError:
+        return None
+    start = offset.rollforward(anchor)
+    return ((start + offset) - start).total_seconds()
+
+
+def _nearest_level(seconds):
+    # Ближайший по логарифму длительности уровень пирамиды
+    return min(PYRAMID_LEVELS, key=lambda level: abs(np.log(PYRAMID_LEVELS[level] / seconds)))
+
+
+def infer_frequency(index):
+    """
+    Определяет частоту ряда по первым FREQUENCY_SAMPLE датам индекса.
+
+    Если pandas не может определить частоту (пропуски, неравномерные отметки), частота
+    выбирается по медианному шагу между датами из уровней PYRAMID_LEVELS.
+
+    Args:
+        index (pd.DatetimeIndex): Индекс дат (по возрастанию).
+
+    Returns:
+        str: Обозначение частоты pandas (например, 'h', 'D', 'MS').
+    """
+    if index.freqstr:
+        return index.freqstr
+    sample = index[:FREQUENCY_SAMPLE]
+    if len(sample) >= 3:
+        freq = pd.infer_freq(sample)
+        if freq is not None:
+            return freq
+    # Повторяющиеся даты дают нулевой шаг и не учитываются
+    diffs = np.diff(sample.asi8)
+    diffs = diffs[diffs > 0]
+    if len(diffs) == 0:
+        return 'MS'
+    step = pd.Timedelta(np.median(diffs), unit=sample.unit).total_seconds()
+    return _nearest_level(step)
+
+
+def default_season_length(freq):
+    """
+    Длина сезона по умолчанию для частоты (12 для месячных данных, 24 для часовых и т.д.).
+    """
+    base = (freq or 'MS').lstrip('0123456789').split('-')[0]
+    if base in DEFAULT_SEASON_LENGTHS:
+        return DEFAULT_SEASON_LENGTHS[base]
+    seconds = freq_seconds(freq)
+    if not seconds or seconds <= 0:
+        return 12
+    return DEFAULT_SEASON_LENGTHS[_nearest_level(seconds)]
+
+
+def detect_season_length(values, freq=None, max_period=None):
+    """
+    Определяет преобладающий сезонный период по периодограмме (БПФ).
+
+    Из ряда удаляется линейный тренд, затем выбирается период с наибольшей мощностью
+    спектра; он принимается, если автокорреляция на этом лаге не меньше SEASONALITY_MIN_ACF.
+    Иначе возвращается длина сезона по умолчанию для частоты.
+
+    Args:
+        values (np.ndarray): Значения ряда без пропусков.
+        freq (str): Частота ряда (для значения по умолчанию).
+        max_period (int): Наибольший период (по умолчанию MAX_SEASON_LENGTH).
+
+    Returns:
+        int: Длина сезона.
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    default = default_season_length(freq)
+    max_period = min(max_period or MAX_SEASON_LENGTH, n // 2)
+    if max_period < 2:
+        return default
+
+    steps = np.arange(n)
+    detrended = values - np.polyval(np.polyfit(steps, values, 1), steps)
+    power = np.abs(np.fft.rfft(detrended)) ** 2
+    frequencies = np.fft.rfftfreq(n)
+    # Частоты, соответствующие периодам от 2 до max_period
+    valid = (frequencies >= 1.0 / max_period) & (frequencies <= 0.5)
+    if not valid.any():
+        return default
+    period = int(round(1.0 / frequencies[valid][np.argmax(power[valid])]))
+
+    variance = np.dot(detrended, detrended)
+    # Дисперсия постоянного ряда после удаления тренда - ошибка округления, а не ноль;
+    # порог задаётся относительно масштаба ряда
+    if period < 2 or period >= n or variance <= 1e-12 * n * max(1.0, np.mean(values ** 2)):
+        return default
+    acf = np.dot(detrended[:-period], detrended[period:]) / variance
+    return period if acf >= SEASONALITY_MIN_ACF else default
+
+
+def build_pyramid(series, freq=None):
+    """
+    Строит пирамиду агрегации ряда: исходная частота и более крупные уровни
+    из PYRAMID_LEVELS (часы -> дни -> недели, дни -> месяцы).
+
+    Уровни считаются через суммы и числа наблюдений, поэтому средние на крупных уровнях
+    точные, а каждый уровень агрегируется из предыдущего, а не из исходного ряда.
+
+    Args:
+        series (pd.Series): Ряд с индексом дат.
+        freq (str): Частота ряда (по умолчанию определяется infer_frequency).
+
+    Returns:
+        dict: Частота уровня -> ряд средних значений (от мелкого уровня к крупному).
+    """
+    freq = freq or infer_frequency(series.index)
+    resampled = series.resample(freq)
+    sums = {freq: resampled.sum()}
+    counts = {freq: resampled.count()}
+
+    native_seconds = freq_seconds(freq)
+    for level, seconds in PYRAMID_LEVELS.items():
+        if native_seconds is None or seconds <= native_seconds * 1.5 or level in sums:
+            continue
+        parent = _PARENT_LEVEL.get(level)
+        source = parent if parent in sums else freq
+        sums[level] = sums[source].resample(level).sum()
+        counts[level] = counts[source].resample(level).sum()
+
+    pyramid = {}
+    for level in sums:
+        mean = sums[level] / counts[level].where(counts[level] > 0)
+        # Пустые интервалы заполняются линейной интерполяцией, чтобы ряд был регулярным
+        pyramid[level] = mean.interpolate(limit_direction='both').asfreq(level)
+    return pyramid
+
+
+def choose_level(pyramid, max_points=None):
+    """
+    Выбирает самый мелкий уровень пирамиды, длина которого не больше max_points.
+
+    Returns:
+        str: Частота выбранного уровня (самый крупный уровень, если все длиннее).
+    """
+    max_points = max_points or MAX_FIT_POINTS
+    for level, values in pyramid.items():
+        if len(values) <= max_points:
+            return level
+    return list(pyramid)[-1]
+
+
+@span('ingest_series')
+def prepare_series(series, max_points=None, season_length=None):
+    """
+    Этап приёма ряда: определение частоты, пирамида агрегации, выбор уровня для обучения
+    моделей и определение длины сезона на этом уровне.
+
+    Args:
+        series (pd.Series): Исходный ряд с индексом дат.
+        max_points (int): Наибольшая длина ряда для обучения (по умолчанию MAX_FIT_POINTS).
+        season_length (int): Длина сезона (по умолчанию определяется по периодограмме).
+
+    Returns:
+        dict: 'series' - ряд выбранного уровня, 'freq' - его частота, 'season_length',
+            'raw_freq' - исходная частота, 'raw_rows' - исходное число строк, 'levels' - длины уровней.
+    """
+    series = series.sort_index()
+    raw_freq = infer_frequency(series.index)
+    pyramid = build_pyramid(series, raw_freq)
+    level = choose_level(pyramid, max_points)
+    chosen = pyramid[level]
+    if season_length is None:
+        season_length = detect_season_length(chosen.to_numpy(), level)
+    return {
+        'series': chosen,
+        'freq': level,
+        'season_length': season_length,
+        'raw_freq': raw_freq,
+        'raw_rows': len(series),
+        'levels': {name: len(values) for name, values in pyramid.items()},
+    }
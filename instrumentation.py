@@ -0,0 +1,230 @@
+import os
+import time
+import uuid
+import bisect
+import cProfile
+import threading
+import functools
+from contextlib import contextmanager
+
+# Папка для дампов cProfile (если не задана, профилирование запросов отключено)
+PROFILE_DIR = os.environ.get('TIMESEER_PROFILE_DIR')
+
+# Границы корзин гистограмм длительности в секундах
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _format_labels(label_names, label_values, extra=None):
+    pairs = list(zip(label_names, label_values)) + (extra or [])
+    if not pairs:
+        return ''
+    escaped = [(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+               for name, value in pairs]
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+class Counter:
+    """
+    Счётчик Prometheus с метками.
+    """
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        """
+        Увеличивает счётчик для заданных значений меток.
+        """
+        key = tuple(labels.get(name, '') for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """
+    Гистограмма Prometheus с метками.
+    """
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """
+        Добавляет наблюдение для заданных значений меток.
+        """
+        key = tuple(labels.get(name, '') for name in self.label_names)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                state['counts'][index] += 1
+            state['sum'] += value
+            state['count'] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state['counts']):
+                    cumulative += count
+                    labels = _format_labels(self.label_names, key, [('le', repr(float(bound)))])
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.label_names, key, [('le', '+Inf')])
+                lines.append(f"{self.name}_bucket{labels} {state['count']}")
+                lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {state['sum']}")
+                lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {state['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Набор метрик процесса, выгружаемых в текстовом формате Prometheus.
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, documentation, label_names=()):
+        metric = Counter(name, documentation, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """
+        Возвращает все метрики в текстовом формате Prometheus.
+        """
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram('timeseer_stage_seconds', 'Длительность этапов обработки', ('stage',))
+STAGE_ERRORS = registry.counter('timeseer_stage_errors_total', 'Число ошибок на этапах обработки', ('stage',))
+REQUEST_SECONDS = registry.histogram('timeseer_request_seconds', 'Длительность HTTP-запросов', ('endpoint',))
+REQUESTS = registry.counter('timeseer_requests_total', 'Число HTTP-запросов', ('endpoint', 'status'))
+MODEL_TIMEOUTS = registry.counter('timeseer_model_timeouts_total', 'Число моделей, прерванных по сроку', ('model',))
+
+# Длительности этапов текущего запроса (для записи в журнал)
+_request_timings = threading.local()
+
+
+def observe_stage(stage, seconds):
+    """
+    Записывает длительность этапа в гистограмму и в длительности текущего запроса.
+    """
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = getattr(_request_timings, 'value', None)
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+class span:
+    """
+    Измерение длительности этапа обработки. Используется как контекстный менеджер
+    (with span('load_data'): ...) или как декоратор (@span('load_data')).
+    """
+
+    def __init__(self, stage):
+        self.stage = stage
+        self._starts = threading.local()
+
+    def __enter__(self):
+        starts = getattr(self._starts, 'value', None)
+        if starts is None:
+            starts = self._starts.value = []
+        starts.append(time.perf_counter())
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        observe_stage(self.stage, time.perf_counter() - self._starts.value.pop())
+        if exc_type is not None:
+            STAGE_ERRORS.inc(stage=self.stage)
+        return False
+
+    def __call__(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with self:
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+def start_request_timings():
+    """
+    Начинает сбор длительностей этапов для текущего запроса.
+    """
+    _request_timings.value = {}
+
+
+def finish_request_timings():
+    """
+    Завершает сбор длительностей этапов текущего запроса.
+
+    Returns:
+        dict: Этап -> длительность в секундах.
+    """
+    timings = getattr(_request_timings, 'value', None) or {}
+    _request_timings.value = None
+    return timings
+
+
+def format_timings(timings):
+    """
+    Форматирует длительности этапов для журнала в виде пар ключ=значение.
+    """
+    return ' '.join(f"{stage}={seconds:.3f}" for stage, seconds in timings.items())
+
+
+@contextmanager
+def profile_request(name, enabled=True):
+    """
+    Профилирование блока кода с помощью cProfile и сохранение дампа в PROFILE_DIR.
+
+    Профилирование выполняется, только если задана папка PROFILE_DIR и enabled=True.
+
+    Args:
+        name (str): Имя профилируемого блока (входит в имя файла дампа).
+        enabled (bool): Включить профилирование.
+
+    Yields:
+        str: Путь к файлу дампа или None, если профилирование отключено.
+    """
+    if not PROFILE_DIR or not enabled:
+        yield None
+        return
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.prof")
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield path
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
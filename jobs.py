@@ -0,0 +1,239 @@
+import os
+import re
+import json
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Число одновременно выполняемых заданий
+JOB_WORKERS = int(os.environ.get('TIMESEER_JOB_WORKERS', 2))
+# Максимальное число заданий в очереди и в работе (ограничение нагрузки)
+JOB_MAX_PENDING = int(os.environ.get('TIMESEER_JOB_MAX_PENDING', 16))
+# Сколько завершённых заданий хранить для выдачи результатов
+JOB_HISTORY_SIZE = int(os.environ.get('TIMESEER_JOB_HISTORY_SIZE', 100))
+# Папка для записей заданий (статус и результат); если задана, задание видно всем процессам
+# сервера, а не только принявшему его (serve.py задаёт папку, уникальную для сервера)
+JOB_RECORD_DIR = os.environ.get('TIMESEER_JOB_DIR')
+
+# Поля записи задания, которые выдаются в статусе
+STATUS_FIELDS = ('id', 'status', 'created_at', 'started_at', 'finished_at', 'error')
+_JOB_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+# Статусы заданий
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATUSES = (DONE, FAILED, CANCELLED)
+
+
+class QueueFullError(Exception):
+    """
+    Очередь заданий заполнена, новое задание не принято.
+    """
+
+
+class JobQueue:
+    """
+    Очередь фоновых заданий процесса с ограниченной параллельностью.
+
+    Задания выполняются в пуле потоков из max_workers потоков. Если число заданий в очереди
+    и в работе достигло max_pending, новые задания отклоняются с QueueFullError.
+
+    Если задана папка record_dir, при каждом изменении задания его запись (статус и результат)
+    атомарно сохраняется в файл <идентификатор>.json, поэтому статус, результат и отмену задания
+    может запросить любой процесс сервера. Отмена из другого процесса оставляет файл-метку
+    <идентификатор>.cancel, которую процесс, выполняющий задание, проверяет при его запуске
+    и завершении.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS, max_pending=JOB_MAX_PENDING, history_size=JOB_HISTORY_SIZE,
+                 record_dir=JOB_RECORD_DIR):
+        self.max_pending = max_pending
+        self.history_size = history_size
+        self.record_dir = record_dir
+        if record_dir is not None:
+            os.makedirs(record_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _record_path(self, job_id, suffix='.json'):
+        if self.record_dir is None or not _JOB_ID_PATTERN.fullmatch(job_id):
+            return None
+        return os.path.join(self.record_dir, f"{job_id}{suffix}")
+
+    def _persist(self, job):
+        # Запись во временный файл и замена делают обновление атомарным для читающих процессов
+        path = self._record_path(job['id'])
+        if path is None:
+            return
+        record = {key: job[key] for key in STATUS_FIELDS + ('result',)}
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(record, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Ошибка записи задания {job['id']}: {str(e)}")
+
+    def _load(self, job_id):
+        path = self._record_path(job_id)
+        if path is None:
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _cancel_marked(self, job):
+        path = self._record_path(job['id'], '.cancel')
+        return path is not None and os.path.exists(path)
+
+    def _remove_records(self, job_id):
+        for suffix in ('.json', '.cancel'):
+            path = self._record_path(job_id, suffix)
+            if path is not None:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Ставит задание в очередь.
+
+        Args:
+            fn (callable): Функция задания.
+            *args, **kwargs: Аргументы функции.
+
+        Returns:
+            str: Идентификатор задания.
+
+        Raises:
+            QueueFullError: Если очередь заполнена.
+        """
+        with self._lock:
+            if self._pending_count() >= self.max_pending:
+                raise QueueFullError(f"Очередь заданий заполнена ({self.max_pending})")
+            job_id = uuid.uuid4().hex
+            job = {
+                'id': job_id,
+                'status': QUEUED,
+                'created_at': time.time(),
+                'started_at': None,
+                'finished_at': None,
+                'result': None,
+                'error': None,
+                'cancel_requested': False,
+            }
+            self._jobs[job_id] = job
+            self._persist(job)
+            job['future'] = self._executor.submit(self._run, job, fn, args, kwargs)
+            self._trim_history()
+        return job_id
+
+    def _run(self, job, fn, args, kwargs):
+        with self._lock:
+            if job['cancel_requested'] or self._cancel_marked(job):
+                job['status'] = CANCELLED
+                job['finished_at'] = time.time()
+                self._persist(job)
+                return
+            job['status'] = RUNNING
+            job['started_at'] = time.time()
+            self._persist(job)
+        try:
+            result = fn(*args, **kwargs)
+            error = None
+        except Exception as e:
+            result = None
+            error = str(e)
+        with self._lock:
+            job['finished_at'] = time.time()
+            if job['cancel_requested'] or self._cancel_marked(job):
+                # Результат отменённого задания отбрасывается
+                job['status'] = CANCELLED
+            elif error is not None:
+                job['status'] = FAILED
+                job['error'] = error
+            else:
+                job['status'] = DONE
+                job['result'] = result
+            self._persist(job)
+
+    def _pending_count(self):
+        return sum(1 for job in self._jobs.values() if job['status'] not in FINISHED_STATUSES)
+
+    def _trim_history(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job['status'] in FINISHED_STATUSES]
+        for job_id in finished[:max(0, len(finished) - self.history_size)]:
+            del self._jobs[job_id]
+            self._remove_records(job_id)
+
+    def status(self, job_id):
+        """
+        Возвращает описание задания без результата или None, если задание не найдено.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return {key: job[key] for key in STATUS_FIELDS}
+        # Задание принято другим процессом сервера
+        record = self._load(job_id)
+        if record is None:
+            return None
+        return {key: record[key] for key in STATUS_FIELDS}
+
+    def result(self, job_id):
+        """
+        Возвращает пару (статус, результат) или (None, None), если задание не найдено.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return job['status'], job['result']
+        record = self._load(job_id)
+        if record is None:
+            return None, None
+        return record['status'], record['result']
+
+    def cancel(self, job_id):
+        """
+        Отменяет задание. Задание из очереди снимается сразу. Отмена выполняющегося задания
+        не гарантирует освобождения ресурсов: после завершения задание получает состояние cancelled,
+        а его результат отбрасывается, но начатое обучение моделей не прерывается и занимает места
+        пула прогнозирования, пока модели не завершатся или не исчерпают свои сроки
+        (FORECAST_BUDGET_SECONDS, MODEL_BUDGET_SECONDS).
+
+        Returns:
+            bool: True, если отмена принята; False, если задание не найдено или уже завершено.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                if job['status'] in FINISHED_STATUSES:
+                    return False
+                job['cancel_requested'] = True
+                if job['status'] == QUEUED and job['future'].cancel():
+                    job['status'] = CANCELLED
+                    job['finished_at'] = time.time()
+                    self._persist(job)
+                return True
+        # Задание выполняется другим процессом: он проверит метку отмены
+        record = self._load(job_id)
+        if record is None or record['status'] in FINISHED_STATUSES:
+            return False
+        with open(self._record_path(job_id, '.cancel'), 'w', encoding='utf-8'):
+            pass
+        return True
+
+    def shutdown(self, wait=False):
+        """
+        Останавливает пул потоков очереди.
+        """
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,248 @@
+import io
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from synthetic import write_synthetic_csv
+
+# Модели, по которым распределяются запросы по умолчанию
+DEFAULT_MODELS = ['sarima', 'prophet', 'holt_winters', 'all']
+# Перцентили задержки в отчёте
+LATENCY_PERCENTILES = (50, 95, 99)
+
+
+def encode_multipart(fields, file_field, file_name, file_bytes):
+    """
+    Кодирование формы с файлом в multipart/form-data для запроса по HTTP.
+
+    Returns:
+        tuple: (тело запроса, значение заголовка Content-Type).
+    """
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+                     .encode('utf-8'))
+    parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{file_name}"\r\n'
+                 f'Content-Type: text/csv\r\n\r\n'.encode('utf-8'))
+    parts.append(file_bytes)
+    parts.append(f'\r\n--{boundary}--\r\n'.encode('utf-8'))
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+class InProcessTarget:
+    """
+    Запросы к приложению в том же процессе через тестовый клиент Flask (по клиенту на поток).
+    """
+
+    def __init__(self):
+        from app import init_app
+        self._app = init_app()
+        self._local = threading.local()
+
+    def post(self, endpoint, fields, file_name, file_bytes, headers=None):
+        """
+        Returns:
+            tuple: (код состояния, значение заголовка X-Cache или None).
+        """
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self._app.test_client()
+        data = dict(fields, file=(io.BytesIO(file_bytes), file_name))
+        response = client.post(endpoint, data=data, content_type='multipart/form-data', headers=headers or {})
+        return response.status_code, response.headers.get('X-Cache')
+
+
+class HttpTarget:
+    """
+    Запросы к запущенному серверу по HTTP (например, http://127.0.0.1:8000).
+    """
+
+    def __init__(self, base_url, timeout=600):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def post(self, endpoint, fields, file_name, file_bytes, headers=None):
+        """
+        Returns:
+            tuple: (код состояния, значение заголовка X-Cache или None).
+        """
+        body, content_type = encode_multipart(fields, 'file', file_name, file_bytes)
+        request = urllib.request.Request(f"{self.base_url}{endpoint}", data=body, method='POST',
+                                         headers=dict(headers or {}, **{'Content-Type': content_type}))
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+                return response.status, response.headers.get('X-Cache')
+        except urllib.error.HTTPError as e:
+            return e.code, e.headers.get('X-Cache')
+
+
+def latency_summary(latencies):
+    """
+    Сводка задержек в секундах: среднее, максимум и перцентили LATENCY_PERCENTILES.
+    """
+    if not latencies:
+        return {'mean': None, 'max': None, **{f"p{p}": None for p in LATENCY_PERCENTILES}}
+    values = np.asarray(latencies, dtype=float)
+    summary = {'mean': float(values.mean()), 'max': float(values.max())}
+    for p, value in zip(LATENCY_PERCENTILES, np.percentile(values, LATENCY_PERCENTILES)):
+        summary[f"p{p}"] = float(value)
+    return summary
+
+
+def summarize_samples(samples, seconds):
+    """
+    Отчёт по выполненным запросам: пропускная способность, задержки, доля ошибок и источники
+    ответов по заголовку X-Cache (HIT - сохранённый ответ, MISS - вычисленный, SHARED -
+    объединённый с одновременным запросом; 'none' - заголовка нет).
+
+    Args:
+        samples (list): Словари {'model', 'status', 'cache', 'seconds', 'error'} по каждому запросу.
+        seconds (float): Длительность нагрузки в секундах.
+
+    Returns:
+        dict: Сводка по всем запросам ('overall') и по моделям ('by_model').
+    """
+    def summary(items):
+        errors = [s for s in items if s['error'] is not None or s['status'] >= 400]
+        codes = {}
+        cache = {}
+        for s in items:
+            codes[str(s['status'])] = codes.get(str(s['status']), 0) + 1
+            source = (s.get('cache') or 'none').lower()
+            cache[source] = cache.get(source, 0) + 1
+        return {
+            'requests': len(items),
+            'errors': len(errors),
+            'error_rate': len(errors) / len(items) if items else None,
+            'throughput_rps': len(items) / seconds if seconds > 0 else None,
+            'latency_seconds': latency_summary([s['seconds'] for s in items]),
+            'status_codes': codes,
+            'cache': cache,
+        }
+
+    models = sorted({s['model'] for s in samples})
+    return {
+        'overall': summary(samples),
+        'by_model': {model: summary([s for s in samples if s['model'] == model]) for model in models},
+    }
+
+
+def run_load(target, datasets, models=None, clients=4, requests_per_client=10, duration=None,
+             endpoint='/predict', steps_ahead=12, column='emissions', bypass_cache=True):
+    """
+    Нагрузка на приложение: clients параллельных клиентов отправляют запросы, перебирая модели и наборы данных.
+
+    Args:
+        target: InProcessTarget или HttpTarget.
+        datasets (list): Пути к CSV-файлам.
+        models (list): Значения поля model (по умолчанию DEFAULT_MODELS).
+        clients (int): Число параллельных клиентов.
+        requests_per_client (int): Число запросов каждого клиента (если не задан duration).
+        duration (float): Длительность нагрузки в секундах (клиенты отправляют запросы, пока она не истечёт).
+        endpoint (str): Адрес запроса.
+        steps_ahead (int): Горизонт прогноза.
+        column (str): Столбец для прогнозирования.
+        bypass_cache (bool): Отправлять Cache-Control: no-cache, чтобы каждый запрос проходил весь путь
+            обработки (разбор CSV и обучение моделей), а не получал сохранённый ответ.
+
+    Returns:
+        tuple: (список результатов запросов, длительность в секундах).
+    """
+    models = models or DEFAULT_MODELS
+    files = []
+    for path in datasets:
+        with open(path, 'rb') as f:
+            files.append((os.path.basename(path), f.read()))
+    headers = {'Cache-Control': 'no-cache'} if bypass_cache else None
+    samples = []
+    lock = threading.Lock()
+    stop_at = None if duration is None else time.monotonic() + duration
+
+    def client(client_id):
+        i = 0
+        while (stop_at is None and i < requests_per_client) or (stop_at is not None and time.monotonic() < stop_at):
+            model = models[(client_id + i) % len(models)]
+            file_name, file_bytes = files[(client_id + i) % len(files)]
+            fields = {'column': column, 'model': model, 'steps_ahead': str(steps_ahead)}
+            start = time.perf_counter()
+            status, cache, error = 0, None, None
+            try:
+                status, cache = target.post(endpoint, fields, file_name, file_bytes, headers)
+            except Exception as e:
+                error = str(e)
+            sample = {'model': model, 'status': status, 'cache': cache, 'seconds': time.perf_counter() - start,
+                      'error': error}
+            with lock:
+                samples.append(sample)
+            i += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        list(executor.map(client, range(clients)))
+    return samples, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочное тестирование /predict на синтетических данных")
+    parser.add_argument('--target', default='inprocess',
+                        help="inprocess (тестовый клиент Flask) или адрес сервера, например http://127.0.0.1:8000")
+    parser.add_argument('--endpoint', default='/predict', help="Адрес запроса")
+    parser.add_argument('--clients', type=int, default=4, help="Число параллельных клиентов")
+    parser.add_argument('--requests', type=int, default=10, help="Число запросов каждого клиента")
+    parser.add_argument('--duration', type=float, help="Длительность нагрузки в секундах (вместо --requests)")
+    parser.add_argument('--models', nargs='*', default=DEFAULT_MODELS, help="Значения поля model")
+    parser.add_argument('--datasets', type=int, default=2, help="Число разных синтетических файлов")
+    parser.add_argument('--length', type=int, default=120, help="Длина синтетических рядов")
+    parser.add_argument('--season-length', type=int, default=12, help="Длина сезона синтетических рядов")
+    parser.add_argument('--columns', type=int, default=3, help="Число столбцов синтетических файлов")
+    parser.add_argument('--freq', default='MS', help="Частота синтетических рядов")
+    parser.add_argument('--steps-ahead', type=int, default=12, help="Горизонт прогноза")
+    parser.add_argument('--seed', type=int, default=0, help="Зерно генератора синтетических рядов")
+    parser.add_argument('--use-cache', action='store_true',
+                        help="Не отправлять Cache-Control: no-cache (измерять ответы из кэша)")
+    parser.add_argument('--output', help="Файл для отчёта в формате JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix='timeseer_loadtest_') as directory:
+        datasets = [write_synthetic_csv(os.path.join(directory, f"synthetic_{i}.csv"), args.length,
+                                        args.season_length, args.columns, args.freq, seed=args.seed + i)
+                    for i in range(args.datasets)]
+        target = InProcessTarget() if args.target == 'inprocess' else HttpTarget(args.target)
+        samples, seconds = run_load(target, datasets, args.models, args.clients, args.requests, args.duration,
+                                    args.endpoint, args.steps_ahead, bypass_cache=not args.use_cache)
+
+    report = {
+        'config': vars(args),
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(time.time() - seconds)),
+        'duration_seconds': seconds,
+        **summarize_samples(samples, seconds),
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+        overall = report['overall']
+        print(f"Запросов: {overall['requests']}, ошибок: {overall['errors']}, "
+              f"{overall['throughput_rps']:.2f} запр./с, p95: {overall['latency_seconds']['p95']:.3f} с, "
+              f"кэш: {overall['cache']}")
+    else:
+        print(text)
+    # Ненулевой код возврата, если все запросы завершились ошибкой
+    if report['overall']['requests'] and report['overall']['errors'] == report['overall']['requests']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,45 +1,89 @@
+import sys
+import json
+import argparse
 import pandas as pd
 import numpy as np
-from data_processing import load_data, preprocess_data, prepare_time_series
-from ai_module import train_lstm_model, lstm_forecast, arima_forecast, detect_anomalies, cluster_data
+from data_processing import load_data, preprocess_series, prepare_time_series
+from ai_module import (train_lstm_model, save_lstm_model, lstm_forecast, arima_forecast, detect_anomalies,
+                       cluster_data, FORECAST_MODELS)
 from uml_module import update_uml_diagram
 from visualization import plot_forecast, create_metrics_table
+from batch import run_batch
 
-def main():
-    # Загрузка данных
-    data = load_data('C:\\Users\\User\\Desktop\\МИЭМ\\ВКР\\VKR\\phosagro_data.csv')
-    if data is None:
-        return
-
+def forecast_single():
     column = 'emissions'
     timesteps = 12
     steps_ahead = 48
 
-    # Предобработка
-    data, scaler = preprocess_data(data, column)
+    # Загрузка данных (только столбец даты и выбранный столбец)
+    data = load_data('C:\\Users\\User\\Desktop\\МИЭМ\\ВКР\\VKR\\phosagro_data.csv', columns=[column])
+    if data is None:
+        return
+
+    # Предобработка (исходные значения сохраняются рядом с нормализованными)
+    series, history, scaler = preprocess_series(data, column)
+    data = series.to_frame()
 
     # Прогнозирование
     X, y = prepare_time_series(data, column, timesteps)
-    X = X.reshape(X.shape[0], X.shape[1], 1)
     model = train_lstm_model(X, y, timesteps, 1, epochs=10)
+    print(f"Модель LSTM сохранена: {save_lstm_model(model)}")
     forecast = lstm_forecast(model, data[column].values, timesteps, steps_ahead)
     forecast = scaler.inverse_transform(forecast.reshape(-1, 1)).flatten()
 
+    forecasts = [forecast]
+    model_names = ['LSTM']
     arima_pred = arima_forecast(data[column], steps_ahead)
-    arima_pred = scaler.inverse_transform(arima_pred.reshape(-1, 1)).flatten()
+    if arima_pred is not None:
+        arima_pred = scaler.inverse_transform(np.asarray(arima_pred).reshape(-1, 1)).flatten()
+        forecasts.append(arima_pred)
+        model_names.append('SARIMA')
 
     # Валидация и кластеризация
     anomalies = detect_anomalies(data[[column]])
     clusters = cluster_data(data[[column]])
 
     # Обновление UML
-    uml_url = update_uml_diagram(forecast)
+    uml_url = update_uml_diagram()
     print(f"UML-диаграмма: {uml_url}")
 
     # Визуализация
-    plot_forecast(data, forecast, column)
-    metrics = create_metrics_table(data[column], anomalies, clusters)
+    history = history.to_numpy(dtype=float)
+    plot_forecast(data.index, history, forecasts, column, model_names)
+    metrics = create_metrics_table(data.index, history, anomalies, clusters)
     print(metrics)
 
+def forecast_batch(args):
+    """
+    Пакетный прогноз: результаты задач (ряд, модель) печатаются построчно в формате NDJSON
+    по мере завершения задач.
+    """
+    sources = [(path, path) for path in args.files]
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        for record in run_batch(sources, args.columns, args.models, args.steps_ahead, args.workers):
+            output.write(json.dumps(record, ensure_ascii=False) + '\n')
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Прогнозирование временных рядов")
+    subparsers = parser.add_subparsers(dest='command')
+    batch_parser = subparsers.add_parser('batch', help="Пакетный прогноз нескольких файлов и столбцов")
+    batch_parser.add_argument('files', nargs='+', help="CSV-файлы (столбец date и столбцы показателей)")
+    batch_parser.add_argument('--columns', nargs='*', help="Столбцы (по умолчанию все числовые)")
+    batch_parser.add_argument('--models', nargs='*', choices=list(FORECAST_MODELS), help="Модели (по умолчанию все)")
+    batch_parser.add_argument('--steps-ahead', type=int, default=12, help="Горизонт прогноза")
+    batch_parser.add_argument('--workers', type=int, default=None, help="Число одновременно обучаемых моделей")
+    batch_parser.add_argument('--output', help="Файл NDJSON (по умолчанию стандартный вывод)")
+    args = parser.parse_args()
+
+    if args.command == 'batch':
+        forecast_batch(args)
+    else:
+        forecast_single()
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,271 @@
+import os
+import hashlib
+import pickle
+import threading
+import contextvars
+from contextlib import contextmanager
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from shared_store import get_shared_store
+
+# Максимальное число обученных моделей в памяти
+MODEL_CACHE_SIZE = int(os.environ.get('TIMESEER_MODEL_CACHE_SIZE', 32))
+# Папка дискового уровня кэша (если не задана, модели хранятся только в памяти)
+MODEL_CACHE_DIR = os.environ.get('TIMESEER_MODEL_CACHE_DIR')
+
+# Запрос пересчёта без чтения кэшей (Cache-Control: no-cache); действует в текущем потоке
+_refresh = contextvars.ContextVar('timeseer_cache_refresh', default=False)
+
+
+@contextmanager
+def cache_refresh(enabled=True):
+    """
+    Контекст, в котором кэши моделей и наборов данных не читаются: модели обучаются и данные
+    разбираются заново, а результаты заменяют сохранённые.
+
+    Args:
+        enabled (bool): Включить пересчёт (False оставляет обычное поведение).
+    """
+    token = _refresh.set(enabled or _refresh.get())
+    try:
+        yield
+    finally:
+        _refresh.reset(token)
+
+
+def refresh_requested():
+    """
+    Возвращает True внутри cache_refresh().
+    """
+    return _refresh.get()
+
+
+def fingerprint_series(data):
+    """
+    Вычисляет хэш содержимого временного ряда (значения и индекс).
+
+    Args:
+        data (pd.Series): Временной ряд (или pd.DataFrame с несколькими столбцами).
+
+    Returns:
+        str: Шестнадцатеричный SHA-256 хэш.
+    """
+    digest = hashlib.sha256()
+    values = np.ascontiguousarray(data.to_numpy(dtype=np.float64))
+    digest.update(repr(values.shape).encode('utf-8'))
+    digest.update(values.tobytes())
+    index = data.index
+    if isinstance(index, pd.DatetimeIndex):
+        digest.update(np.ascontiguousarray(index.asi8).tobytes())
+    else:
+        digest.update(repr(index.tolist()).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def make_cache_key(model_type, fingerprint, params=None):
+    """
+    Формирует ключ кэша из типа модели, хэша ряда и параметров модели.
+
+    Args:
+        model_type (str): Тип модели (например, 'sarima').
+        fingerprint (str): Хэш временного ряда.
+        params (dict): Параметры модели.
+
+    Returns:
+        str: Ключ кэша.
+    """
+    params_repr = repr(sorted((params or {}).items()))
+    raw = f"{model_type}|{fingerprint}|{params_repr}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class LRUCache:
+    """
+    Потокобезопасный LRU-кэш ограниченного размера с необязательными уровнями в общей памяти
+    и на диске.
+
+    Объекты на диске хранятся в формате pickle, по одному файлу на ключ. Уровень в общей памяти
+    (shared_store.SharedObjectStore) доступен всем рабочим процессам сервера. При промахе в памяти
+    процесса объект ищется в общей памяти, затем на диске и поднимается в память процесса.
+    """
+
+    def __init__(self, maxsize=MODEL_CACHE_SIZE, directory=None, shared=None):
+        self.maxsize = maxsize
+        self.directory = directory
+        self.shared = shared
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        # Номер поколения: увеличивается при очистке, входит в ключи зависящих от кэша ответов
+        self.generation = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _disk_path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def get(self, key):
+        """
+        Возвращает объект по ключу или None, если его нет в кэше.
+        """
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+        if self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                self._store(key, value)
+                return value
+        if not self.directory:
+            return None
+        path = self._disk_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except Exception as e:
+            print(f"Ошибка чтения кэша {path}: {str(e)}")
+            return None
+        self._store(key, value)
+        return value
+
+    def put(self, key, value, replace=False):
+        """
+        Сохраняет объект в памяти и, если заданы, в общей памяти и на диске.
+
+        Args:
+            key: Ключ объекта.
+            value: Объект.
+            replace: Запись изменяемая: заменить её в общей памяти (иначе запись в общую
+                память однократная, и другие процессы продолжили бы читать старое значение).
+        """
+        self._store(key, value)
+        if self.shared is not None:
+            self.shared.put(key, value, replace=replace)
+        if not self.directory:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Ошибка записи кэша {path}: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _store(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def __contains__(self, key):
+        with self._lock:
+            if key in self._items:
+                return True
+        if self.shared is not None and key in self.shared:
+            return True
+        return bool(self.directory) and os.path.exists(self._disk_path(key))
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def clear(self):
+        """
+        Очищает уровень кэша в памяти.
+        """
+        with self._lock:
+            self._items.clear()
+            self.generation += 1
+
+
+# Общий кэш обученных моделей процесса
+model_cache = LRUCache(MODEL_CACHE_SIZE, MODEL_CACHE_DIR, get_shared_store())
+
+
+def lineage_key(model_type, data, params=None):
+    """
+    Ключ «родословной» ряда: тип модели, параметры, имя ряда и первая дата.
+
+    Ряды с одинаковым ключом родословной считаются версиями одного набора данных,
+    к которому дописываются новые наблюдения.
+    """
+    first = data.index[0] if len(data) else None
+    name = data.name if isinstance(data, pd.Series) else tuple(data.columns)
+    raw = f"lineage|{model_type}|{name}|{first}|{repr(sorted((params or {}).items()))}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def find_appended_rows(data, previous_length, previous_fingerprint):
+    """
+    Проверяет, что ряд - это предыдущий набор данных с дописанными в конец строками.
+
+    Args:
+        data (pd.Series): Текущий временной ряд.
+        previous_length (int): Длина предыдущего ряда.
+        previous_fingerprint (str): Хэш предыдущего ряда.
+
+    Returns:
+        pd.Series: Дописанные строки или None, если ряд не является продолжением предыдущего.
+    """
+    if previous_length >= len(data):
+        return None
+    if fingerprint_series(data.iloc[:previous_length]) != previous_fingerprint:
+        return None
+    return data.iloc[previous_length:]
+
+
+def get_or_fit(model_type, data, params, fit_fn, cache=None, update_fn=None, max_new_rows=None):
+    """
+    Возвращает обученную модель из кэша или обучает её и сохраняет в кэш.
+
+    Ключ кэша строится по содержимому ряда, типу модели и её параметрам, поэтому
+    повторный запрос с тем же рядом и другим горизонтом прогноза не переобучает модель.
+    Если задан update_fn и ряд - это ранее обученный ряд с дописанными строками
+    (не более max_new_rows), модель не обучается заново, а дополняется новыми наблюдениями.
+    Внутри cache_refresh() кэш не читается: модель обучается заново и заменяет сохранённую.
+
+    Args:
+        model_type (str): Тип модели (например, 'sarima').
+        data (pd.Series): Временной ряд.
+        params (dict): Параметры модели, передаются в fit_fn.
+        fit_fn (callable): Функция обучения fit_fn(data, **params).
+        cache (LRUCache): Кэш (по умолчанию общий model_cache).
+        update_fn (callable): Функция дообучения update_fn(model_fit, new_data, **params).
+        max_new_rows (int): Наибольшее число новых строк для дообучения вместо полного обучения.
+
+    Returns:
+        object: Обученная модель.
+    """
+    cache = cache if cache is not None else model_cache
+    fingerprint = fingerprint_series(data)
+    key = make_cache_key(model_type, fingerprint, params)
+    refresh = refresh_requested()
+    model_fit = None if refresh else cache.get(key)
+    if model_fit is not None:
+        return model_fit
+
+    lineage = lineage_key(model_type, data, params) if update_fn is not None else None
+    if lineage is not None and not refresh:
+        previous = cache.get(lineage)
+        if previous is not None:
+            new_rows = find_appended_rows(data, previous['length'], previous['fingerprint'])
+            if new_rows is not None and (max_new_rows is None or len(new_rows) <= max_new_rows):
+                previous_fit = cache.get(previous['key'])
+                if previous_fit is not None:
+                    model_fit = update_fn(previous_fit, new_rows, **params)
+
+    if model_fit is None:
+        model_fit = fit_fn(data, **params)
+    cache.put(key, model_fit, replace=refresh)
+    if lineage is not None:
+        cache.put(lineage, {'key': key, 'fingerprint': fingerprint, 'length': len(data)}, replace=True)
+    return model_fit
@@ -0,0 +1,218 @@
+import numpy as np
+
+
+class RobustZScoreDetector:
+    """
+    Потоковый детектор аномалий на основе робастной z-оценки.
+
+    Медиана оценивается стохастическим приближением, а масштаб - экспоненциально взвешенным
+    средним абсолютным отклонением от медианы. Состояние занимает O(1) памяти, обработка
+    одной точки выполняется за O(1); метки точек возвращаются вызывающему коду и не хранятся.
+    """
+
+    def __init__(self, alpha=0.05, threshold=3.5, warmup=12):
+        """
+        Args:
+            alpha (float): Скорость обновления оценок медианы и масштаба.
+            threshold (float): Порог робастной z-оценки для аномалии.
+            warmup (int): Число первых точек, которые не помечаются как аномалии.
+        """
+        self.alpha = alpha
+        self.threshold = threshold
+        self.warmup = warmup
+        self.median = None
+        self.deviation = 0.0
+        self.n_seen = 0
+
+    def score_one(self, x):
+        """
+        Робастная z-оценка точки без обновления состояния.
+        """
+        if self.median is None or self.deviation <= 0:
+            return 0.0
+        # Для нормального распределения среднее абсолютное отклонение равно 0.7979 * sigma
+        return abs(x - self.median) / (1.2533 * self.deviation)
+
+    def update(self, x):
+        """
+        Оценивает точку и обновляет состояние.
+
+        Args:
+            x (float): Новое наблюдение.
+
+        Returns:
+            int: -1 для аномалии, 1 для нормальной точки.
+        """
+        x = float(x)
+        if self.median is None:
+            self.median = x
+            self.n_seen = 1
+            return 1
+
+        score = self.score_one(x)
+        label = -1 if self.n_seen >= self.warmup and score > self.threshold else 1
+
+        # Аномальные значения ограничиваются, чтобы не смещать оценки
+        scale = 1.2533 * self.deviation
+        if scale > 0:
+            x = min(max(x, self.median - self.threshold * scale), self.median + self.threshold * scale)
+        difference = x - self.median
+        # На первых точках вес больше, чтобы оценки быстрее сошлись
+        weight = max(self.alpha, 1.0 / (self.n_seen + 1))
+        step = weight * (self.deviation if self.deviation > 0 else abs(difference))
+        self.median += step * np.sign(difference)
+        self.deviation += weight * (abs(difference) - self.deviation)
+        self.n_seen += 1
+        return label
+
+    def fit_predict(self, values):
+        """
+        Последовательно обрабатывает массив наблюдений.
+
+        Args:
+            values (np.ndarray): Наблюдения (одномерный массив или столбец).
+
+        Returns:
+            np.ndarray: Метки аномалий (-1 для аномалий, 1 для нормальных точек).
+        """
+        return np.array([self.update(x) for x in np.asarray(values, dtype=float).ravel()])
+
+
+class HalfSpaceTrees:
+    """
+    Потоковый древовидный детектор аномалий Half-Space Trees (Tan, Ting, Liu, 2011).
+
+    Деревья строятся случайно без обучения, а в узлах хранятся массы точек опорного и текущего окна.
+    Обработка одной точки стоит O(n_trees * depth) и не зависит от длины ряда; состояние
+    (массы узлов и буфер первого окна) тоже не растёт с длиной ряда.
+    """
+
+    def __init__(self, n_trees=25, depth=8, window=64, size_limit=None, threshold=0.05, random_state=42):
+        """
+        Args:
+            n_trees (int): Число деревьев.
+            depth (int): Глубина деревьев.
+            window (int): Размер окна; после каждого окна текущие массы становятся опорными.
+            size_limit (int): Наименьшая масса узла для спуска ниже (по умолчанию 0.1 * window).
+            threshold (float): Доля от средней оценки, ниже которой точка считается аномалией.
+            random_state (int): Зерно генератора случайных чисел.
+        """
+        self.n_trees = n_trees
+        self.depth = depth
+        self.window = window
+        self.size_limit = size_limit if size_limit is not None else max(1, int(0.1 * window))
+        self.threshold = threshold
+        self.random_state = random_state
+        self._buffer = []
+        self._built = False
+        self._n_in_window = 0
+        self._score_mean = 0.0
+        self._n_scored = 0
+
+    def _build(self, sample):
+        rng = np.random.default_rng(self.random_state)
+        n_features = sample.shape[1]
+        self._low = sample.min(axis=0)
+        span = sample.max(axis=0) - self._low
+        self._span = np.where(span > 0, span, 1.0)
+
+        n_nodes = 2 ** (self.depth + 1) - 1
+        self._split_dim = np.zeros((self.n_trees, n_nodes), dtype=np.int64)
+        self._split_value = np.zeros((self.n_trees, n_nodes))
+        for tree in range(self.n_trees):
+            # Случайные рабочие диапазоны признаков, как в исходном алгоритме
+            s = rng.random(n_features)
+            half = 2 * np.maximum(s, 1 - s)
+            low = np.tile(s - half, (n_nodes, 1))
+            high = np.tile(s + half, (n_nodes, 1))
+            for node in range(2 ** self.depth - 1):
+                dim = rng.integers(n_features)
+                value = (low[node, dim] + high[node, dim]) / 2
+                self._split_dim[tree, node] = dim
+                self._split_value[tree, node] = value
+                left, right = 2 * node + 1, 2 * node + 2
+                low[left], high[left] = low[node], high[node]
+                low[right], high[right] = low[node], high[node]
+                high[left, dim] = value
+                low[right, dim] = value
+        self._node_depth = np.floor(np.log2(np.arange(n_nodes) + 1)).astype(np.int64)
+        self._reference = np.zeros((self.n_trees, n_nodes))
+        self._latest = np.zeros((self.n_trees, n_nodes))
+        self._built = True
+
+    def _path(self, x):
+        # Узлы пути от корня до листа для каждого дерева: массив (n_trees, depth + 1)
+        nodes = np.zeros((self.n_trees, self.depth + 1), dtype=np.int64)
+        trees = np.arange(self.n_trees)
+        current = np.zeros(self.n_trees, dtype=np.int64)
+        for level in range(1, self.depth + 1):
+            dims = self._split_dim[trees, current]
+            go_right = x[dims] >= self._split_value[trees, current]
+            current = 2 * current + 1 + go_right
+            nodes[:, level] = current
+        return nodes
+
+    def _score(self, nodes):
+        trees = np.arange(self.n_trees)[:, None]
+        mass = self._reference[trees, nodes]
+        # Спуск останавливается на первом узле с массой меньше size_limit
+        below = mass < self.size_limit
+        stop = np.where(below.any(axis=1), below.argmax(axis=1), self.depth)
+        stop_nodes = nodes[np.arange(self.n_trees), stop]
+        stop_mass = self._reference[np.arange(self.n_trees), stop_nodes]
+        return float(np.sum(stop_mass * 2.0 ** self._node_depth[stop_nodes]))
+
+    def update(self, x):
+        """
+        Оценивает точку и обновляет массы узлов.
+
+        Args:
+            x (np.ndarray): Новое наблюдение (скаляр или вектор признаков).
+
+        Returns:
+            int: -1 для аномалии, 1 для нормальной точки.
+        """
+        x = np.atleast_1d(np.asarray(x, dtype=float))
+        if not self._built:
+            # Первое окно используется для нормировки признаков и заполнения опорных масс
+            self._buffer.append(x)
+            if len(self._buffer) == self.window:
+                sample = np.vstack(self._buffer)
+                self._build(sample)
+                for point in sample:
+                    nodes = self._path((point - self._low) / self._span)
+                    self._latest[np.arange(self.n_trees)[:, None], nodes] += 1
+                self._reference, self._latest = self._latest, np.zeros_like(self._latest)
+                self._buffer = []
+            return 1
+
+        nodes = self._path((x - self._low) / self._span)
+        score = self._score(nodes)
+
+        # Низкая масса означает аномалию; порог - доля экспоненциально взвешенной средней оценки
+        label = -1 if self._n_scored >= self.window and score < self.threshold * self._score_mean else 1
+        weight = max(1.0 / (self._n_scored + 1), 1.0 / self.window)
+        self._score_mean += weight * (score - self._score_mean)
+        self._n_scored += 1
+
+        self._latest[np.arange(self.n_trees)[:, None], nodes] += 1
+        self._n_in_window += 1
+        if self._n_in_window == self.window:
+            self._reference, self._latest = self._latest, np.zeros_like(self._latest)
+            self._n_in_window = 0
+        return label
+
+    def fit_predict(self, values):
+        """
+        Последовательно обрабатывает массив наблюдений.
+
+        Args:
+            values (np.ndarray): Наблюдения (n,) или (n, n_features).
+
+        Returns:
+            np.ndarray: Метки аномалий (-1 для аномалий, 1 для нормальных точек).
+        """
+        values = np.asarray(values, dtype=float)
+        if values.ndim == 1:
+            values = values[:, None]
+        return np.array([self.update(row) for row in values])
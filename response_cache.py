@@ -0,0 +1,151 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+# 1 - ответы /predict кэшируются по хэшу загруженного файла и параметрам формы
+RESPONSE_CACHE_ENABLED = os.environ.get('TIMESEER_RESPONSE_CACHE', '1') == '1'
+# Наибольший суммарный размер кэшированных ответов в байтах
+RESPONSE_CACHE_BYTES = int(os.environ.get('TIMESEER_RESPONSE_CACHE_BYTES', 64 * 1024 * 1024))
+# Время жизни ответа в секундах
+RESPONSE_CACHE_TTL = float(os.environ.get('TIMESEER_RESPONSE_CACHE_TTL', 3600))
+
+
+def response_key(upload_hash, **params):
+    """
+    Ключ ответа: хэш загруженного файла и параметры формы, от которых зависит ответ.
+    """
+    raw = f"{upload_hash}|{repr(sorted(params.items()))}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class CachedResponse:
+    """
+    Сохранённый ответ: тело, код состояния, тип содержимого, ETag и связанные данные (например,
+    идентификатор результата, без которого ответ недействителен).
+    """
+
+    def __init__(self, body, status=200, mimetype='text/html', meta=None):
+        self.body = body if isinstance(body, bytes) else body.encode('utf-8')
+        self.status = status
+        self.mimetype = mimetype
+        self.meta = meta or {}
+        self.etag = hashlib.sha256(self.body).hexdigest()[:32]
+        self.created = time.monotonic()
+
+
+class ResponseCache:
+    """
+    Потокобезопасный LRU-кэш HTTP-ответов, ограниченный суммарным размером и временем жизни.
+
+    get_or_compute объединяет одновременные одинаковые запросы: ответ вычисляет первый из них,
+    остальные ждут его результата. Сохраняются только успешные ответы (код 200).
+    """
+
+    def __init__(self, max_bytes=RESPONSE_CACHE_BYTES, ttl=RESPONSE_CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._bytes = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Возвращает сохранённый ответ или None, если его нет или истекло время жизни.
+        """
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                return None
+            if self.ttl and time.monotonic() - entry.created > self.ttl:
+                self._remove(key)
+                return None
+            self._items.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        """
+        Сохраняет ответ и вытесняет давно не использованные ответы при превышении размера.
+        """
+        if entry.status != 200 or len(entry.body) > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._items[key] = entry
+            self._bytes += len(entry.body)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._items)))
+
+    def invalidate(self, key):
+        """
+        Удаляет ответ из кэша.
+        """
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        """
+        Удаляет все ответы (например, после обновления моделей).
+
+        Returns:
+            int: Число удалённых ответов.
+        """
+        with self._lock:
+            count = len(self._items)
+            self._items.clear()
+            self._bytes = 0
+            return count
+
+    def _remove(self, key):
+        entry = self._items.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry.body)
+
+    def get_or_compute(self, key, compute, refresh=False):
+        """
+        Возвращает сохранённый ответ или вычисляет его, объединяя одновременные запросы с тем же ключом.
+
+        Args:
+            key (str): Ключ ответа (см. response_key).
+            compute (callable): Функция без аргументов, возвращающая CachedResponse.
+            refresh (bool): Не использовать сохранённый ответ (он заменяется новым). Такой запрос
+                не объединяется с одновременными запросами и всегда вычисляет ответ сам.
+
+        Returns:
+            tuple: (CachedResponse, источник 'hit', 'miss' или 'shared').
+        """
+        if refresh:
+            entry = compute()
+            self.put(key, entry)
+            return entry, 'miss'
+
+        entry = self.get(key)
+        if entry is not None:
+            return entry, 'hit'
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            return future.result(), 'shared'
+
+        try:
+            entry = compute()
+            self.put(key, entry)
+            future.set_result(entry)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        return entry, 'miss'
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
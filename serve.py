@@ -0,0 +1,138 @@
+import os
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+
+# Адрес, на котором принимает запросы сервер
+SERVE_BIND = os.environ.get('TIMESEER_BIND', '0.0.0.0:8000')
+# Число рабочих процессов (по умолчанию по числу ядер)
+SERVE_WORKERS = int(os.environ.get('TIMESEER_SERVE_WORKERS', multiprocessing.cpu_count()))
+# Число потоков в каждом рабочем процессе
+SERVE_THREADS = int(os.environ.get('TIMESEER_SERVE_THREADS', 4))
+# Число запросов, после которого рабочий процесс перезапускается (0 - без перезапуска), и разброс этого числа
+SERVE_MAX_REQUESTS = int(os.environ.get('TIMESEER_SERVE_MAX_REQUESTS', 1000))
+SERVE_MAX_REQUESTS_JITTER = int(os.environ.get('TIMESEER_SERVE_MAX_REQUESTS_JITTER', 100))
+# Срок в секундах, после которого зависший рабочий процесс перезапускается
+SERVE_TIMEOUT = int(os.environ.get('TIMESEER_SERVE_TIMEOUT', 180))
+
+# Временная папка записей заданий, созданная load_app (None - папка задана пользователем)
+_server_job_dir = None
+
+
+def load_app():
+    """
+    Импортирует приложение в главном процессе до запуска рабочих процессов.
+
+    Бэкенды моделей импортируются сразу (TIMESEER_WARM_UP=1), поэтому рабочие процессы получают
+    их после fork без повторного импорта. Разобранные наборы данных, обученные модели и результаты
+    хранятся в общей памяти (TIMESEER_SHARED_STORE=1) с префиксом, уникальным для сервера, а записи
+    фоновых заданий - в папке сервера (TIMESEER_JOB_DIR).
+    """
+    global _server_job_dir
+    os.environ.setdefault('TIMESEER_WARM_UP', '1')
+    os.environ.setdefault('TIMESEER_SHARED_STORE', '1')
+    os.environ.setdefault('TIMESEER_SHARED_PREFIX', f"timeseer{os.getpid()}")
+    # Записи фоновых заданий хранятся в папке сервера, чтобы задание было видно всем рабочим процессам;
+    # временная папка, созданная для сервера, удаляется при его остановке
+    if not os.environ.get('TIMESEER_JOB_DIR'):
+        _server_job_dir = os.path.join(tempfile.gettempdir(), f"timeseer_jobs_{os.getpid()}")
+        os.environ['TIMESEER_JOB_DIR'] = _server_job_dir
+    from app import init_app
+    return init_app()
+
+
+def on_starting(server):
+    # Сервер процессов прогнозирования (forkserver) запускается один раз в главном процессе
+    # после загрузки приложения и импортирует бэкенды моделей; рабочие процессы им пользуются
+    from ai_module import get_worker_pool
+    get_worker_pool().start()
+
+
+def post_fork(server, worker):
+    from workers import inherit_forkserver
+    inherit_forkserver()
+
+
+def worker_exit(server, worker):
+    # Процессы прогнозирования рабочего процесса останавливаются вместе с ним
+    from ai_module import shutdown_worker_pool
+    shutdown_worker_pool()
+
+
+def on_exit(server):
+    # Сегменты общей памяти и записи заданий переживают рабочие процессы и удаляются главным процессом
+    from shared_store import get_shared_store
+    store = get_shared_store()
+    if store is not None:
+        store.clear()
+    if _server_job_dir is not None:
+        shutil.rmtree(_server_job_dir, ignore_errors=True)
+
+
+def gunicorn_options(bind=SERVE_BIND, workers=SERVE_WORKERS, threads=SERVE_THREADS,
+                     max_requests=SERVE_MAX_REQUESTS, max_requests_jitter=SERVE_MAX_REQUESTS_JITTER,
+                     timeout=SERVE_TIMEOUT):
+    """
+    Настройки gunicorn: предварительно запущенные рабочие процессы с потоками (gthread),
+    приложение загружается до fork (preload_app).
+
+    Returns:
+        dict: Настройки gunicorn.
+    """
+    return {
+        'bind': bind,
+        'workers': workers,
+        'threads': threads,
+        'worker_class': 'gthread',
+        'preload_app': True,
+        'max_requests': max_requests,
+        'max_requests_jitter': max_requests_jitter if max_requests else 0,
+        'timeout': timeout,
+        'on_starting': on_starting,
+        'post_fork': post_fork,
+        'worker_exit': worker_exit,
+        'on_exit': on_exit,
+    }
+
+
+def serve(options):
+    """
+    Запускает приложение под gunicorn (требуется установленный gunicorn, только POSIX).
+
+    Args:
+        options (dict): Настройки gunicorn (см. gunicorn_options).
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise RuntimeError("Для запуска сервера требуется gunicorn (pip install gunicorn)")
+
+    class TimeseerApplication(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return load_app()
+
+    TimeseerApplication().run()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Запуск приложения в режиме эксплуатации (gunicorn)")
+    parser.add_argument('--bind', default=SERVE_BIND, help="Адрес сервера")
+    parser.add_argument('--workers', type=int, default=SERVE_WORKERS, help="Число рабочих процессов")
+    parser.add_argument('--threads', type=int, default=SERVE_THREADS, help="Число потоков в рабочем процессе")
+    parser.add_argument('--max-requests', type=int, default=SERVE_MAX_REQUESTS,
+                        help="Число запросов до перезапуска рабочего процесса (0 - без перезапуска)")
+    parser.add_argument('--max-requests-jitter', type=int, default=SERVE_MAX_REQUESTS_JITTER,
+                        help="Случайный разброс числа запросов до перезапуска")
+    parser.add_argument('--timeout', type=int, default=SERVE_TIMEOUT, help="Срок ответа рабочего процесса в секундах")
+    args = parser.parse_args()
+    serve(gunicorn_options(args.bind, args.workers, args.threads, args.max_requests, args.max_requests_jitter,
+                           args.timeout))
+
+
+if __name__ == '__main__':
+    main()
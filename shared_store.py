@@ -0,0 +1,260 @@
+import os
+import struct
+import pickle
+import hashlib
+import threading
+from multiprocessing import shared_memory, resource_tracker
+
+# 1 - разобранные наборы данных, обученные модели и результаты хранятся в общей памяти,
+# доступной всем рабочим процессам (включается serve.py)
+SHARED_STORE_ENABLED = os.environ.get('TIMESEER_SHARED_STORE', '0') == '1'
+# Префикс имён сегментов общей памяти (serve.py задаёт префикс с PID главного процесса)
+SHARED_STORE_PREFIX = os.environ.get('TIMESEER_SHARED_PREFIX', 'timeseer')
+# Наибольший суммарный размер сегментов в байтах
+SHARED_STORE_BYTES = int(os.environ.get('TIMESEER_SHARED_STORE_BYTES', 512 * 1024 * 1024))
+
+# Папка сегментов общей памяти POSIX (используется для вытеснения и очистки)
+_SHM_DIR = '/dev/shm'
+# Заголовок сегмента: метка готовности, число буферов, длина pickle
+_HEADER = struct.Struct('<8sQQ')
+_BUFFER_ENTRY = struct.Struct('<QQ')
+_MAGIC = b'TSSHM001'
+_ALIGNMENT = 64
+
+
+def _align(offset):
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def _untrack(shm):
+    # Сегменты живут дольше создавшего их рабочего процесса (он может быть перезапущен
+    # по max_requests), поэтому они не передаются resource_tracker для удаления при выходе
+    try:
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    except Exception:
+        pass
+
+
+class _Segment(shared_memory.SharedMemory):
+    def __del__(self):
+        try:
+            self.close()
+        except BufferError:
+            # На память сегмента ещё ссылаются восстановленные объекты; она освобождается при выходе процесса
+            pass
+
+
+class SharedObjectStore:
+    """
+    Хранилище объектов только для чтения в общей памяти (multiprocessing.shared_memory).
+
+    Объект сериализуется pickle (протокол 5) с внешними буферами: массивы NumPy и pandas
+    записываются в сегмент как есть, а при чтении восстанавливаются как представления
+    над общей памятью без копирования, поэтому процессы не держат собственных копий данных.
+    Имя сегмента вычисляется по ключу, так что любой процесс находит объект без общего
+    реестра. Сегмент становится видимым для чтения после записи метки готовности.
+
+    Изменяемые записи перезаписываются через put(..., replace=True): старый сегмент удаляется
+    и создаётся новый с тем же именем. Подключение процесса проверяется по номеру inode
+    сегмента, поэтому удалённые (вытесненные или заменённые) сегменты отключаются при
+    следующем обращении и их память освобождается.
+    """
+
+    def __init__(self, prefix=SHARED_STORE_PREFIX, max_bytes=SHARED_STORE_BYTES):
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        # Подключённые сегменты процесса: имя -> (сегмент, inode); на их память ссылаются
+        # восстановленные объекты
+        self._attached = {}
+        # Отключённые сегменты, которые ещё нельзя закрыть из-за ссылок на их память
+        self._retired = []
+        self._lock = threading.Lock()
+
+    def _segment_name(self, key):
+        return f"{self.prefix}_{hashlib.sha256(key.encode('utf-8')).hexdigest()[:20]}"
+
+    def get(self, key):
+        """
+        Возвращает объект по ключу или None, если его нет в общей памяти.
+        """
+        name = self._segment_name(key)
+        self._close_retired()
+        try:
+            inode = os.stat(os.path.join(_SHM_DIR, name)).st_ino
+        except OSError:
+            inode = None
+        with self._lock:
+            shm, attached_inode = self._attached.get(name, (None, None))
+        if shm is not None and attached_inode != inode:
+            # Сегмент вытеснен или заменён другим процессом
+            self._detach(name)
+            shm = None
+        if inode is None:
+            return None
+        if shm is None:
+            try:
+                shm = _Segment(name=name)
+            except (FileNotFoundError, OSError):
+                return None
+            _untrack(shm)
+            inode = os.fstat(shm._fd).st_ino
+            if _HEADER.unpack_from(shm.buf, 0)[0] != _MAGIC:
+                # Сегмент ещё записывается другим процессом
+                shm.close()
+                return None
+        view = shm.buf.toreadonly()
+        _, n_buffers, pickle_length = _HEADER.unpack_from(view, 0)
+        offset = _HEADER.size
+        buffers = []
+        for _ in range(n_buffers):
+            start, length = _BUFFER_ENTRY.unpack_from(view, offset)
+            buffers.append(view[start:start + length])
+            offset += _BUFFER_ENTRY.size
+        try:
+            value = pickle.loads(view[offset:offset + pickle_length], buffers=buffers)
+        except Exception as e:
+            print(f"Ошибка чтения общей памяти {name}: {str(e)}")
+            return None
+        with self._lock:
+            self._attached[name] = (shm, inode)
+        return value
+
+    def put(self, key, value, replace=False):
+        """
+        Записывает объект в общую память.
+
+        Args:
+            key: Ключ объекта.
+            value: Объект.
+            replace: Заменить существующий сегмент с таким ключом. Без этого флага запись
+                однократная: если сегмент уже есть, ничего не делается.
+
+        Returns:
+            bool: True, если объект записан.
+        """
+        buffers = []
+        try:
+            payload = pickle.dumps(value, protocol=5, buffer_callback=buffers.append)
+            raw_buffers = [buffer.raw() for buffer in buffers]
+        except Exception as e:
+            print(f"Ошибка сериализации для общей памяти: {str(e)}")
+            return False
+
+        table_end = _HEADER.size + _BUFFER_ENTRY.size * len(raw_buffers)
+        offsets = []
+        offset = _align(table_end + len(payload))
+        for raw in raw_buffers:
+            offsets.append(offset)
+            offset = _align(offset + raw.nbytes)
+        size = max(offset, 1)
+        if size > self.max_bytes:
+            return False
+        self._close_retired()
+        self._evict(size)
+
+        name = self._segment_name(key)
+        if replace:
+            self._unlink(name)
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            return False
+        except OSError as e:
+            print(f"Ошибка создания сегмента общей памяти: {str(e)}")
+            return False
+        _untrack(shm)
+        try:
+            position = _HEADER.size
+            for start, raw in zip(offsets, raw_buffers):
+                _BUFFER_ENTRY.pack_into(shm.buf, position, start, raw.nbytes)
+                shm.buf[start:start + raw.nbytes] = raw
+                position += _BUFFER_ENTRY.size
+            shm.buf[table_end:table_end + len(payload)] = payload
+            # Метка готовности записывается последней
+            _HEADER.pack_into(shm.buf, 0, _MAGIC, len(raw_buffers), len(payload))
+        finally:
+            shm.close()
+        return True
+
+    def _segments(self):
+        if not os.path.isdir(_SHM_DIR):
+            return []
+        segments = []
+        for entry in os.scandir(_SHM_DIR):
+            if entry.name.startswith(f"{self.prefix}_"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                segments.append((stat.st_mtime, stat.st_size, entry.name))
+        return segments
+
+    def _evict(self, incoming):
+        # Удаление самых старых сегментов; процессы, уже подключившие сегмент, продолжают
+        # им пользоваться до закрытия (POSIX удаляет только имя)
+        segments = sorted(self._segments())
+        total = sum(size for _, size, _ in segments) + incoming
+        for _, size, name in segments:
+            if total <= self.max_bytes:
+                break
+            self._unlink(name)
+            total -= size
+
+    def _detach(self, name):
+        with self._lock:
+            shm, _ = self._attached.pop(name, (None, None))
+            if shm is not None:
+                self._retired.append(shm)
+        self._close_retired()
+
+    def _close_retired(self):
+        # Память отключённого сегмента освобождается, когда на неё больше не ссылаются объекты
+        with self._lock:
+            retired, self._retired = self._retired, []
+            for shm in retired:
+                try:
+                    shm.close()
+                except BufferError:
+                    self._retired.append(shm)
+
+    def _unlink(self, name):
+        self._detach(name)
+        try:
+            shm = shared_memory.SharedMemory(name=name)
+        except (FileNotFoundError, OSError):
+            return
+        shm.close()
+        try:
+            # unlink снимает регистрацию в resource_tracker, поэтому сегмент остаётся зарегистрированным до него
+            shm.unlink()
+        except FileNotFoundError:
+            _untrack(shm)
+
+    def __contains__(self, key):
+        return os.path.exists(os.path.join(_SHM_DIR, self._segment_name(key)))
+
+    def clear(self):
+        """
+        Удаляет все сегменты хранилища (вызывается главным процессом при остановке сервера).
+        """
+        for _, _, name in self._segments():
+            self._unlink(name)
+        with self._lock:
+            names = list(self._attached)
+        for name in names:
+            self._detach(name)
+
+
+_shared_store = None
+
+
+def get_shared_store():
+    """
+    Возвращает общее хранилище процесса или None, если общая память не включена (TIMESEER_SHARED_STORE).
+    """
+    global _shared_store
+    if not SHARED_STORE_ENABLED:
+        return None
+    if _shared_store is None:
+        _shared_store = SharedObjectStore()
+    return _shared_store
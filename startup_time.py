@@ -0,0 +1,67 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+# Модули, время холодного импорта которых измеряется по умолчанию
+DEFAULT_MODULES = ['ai_module', 'data_processing', 'app']
+
+_MEASURE_CODE = """
+import json, sys, time
+start = time.perf_counter()
+__import__(sys.argv[1])
+import_seconds = time.perf_counter() - start
+warm_up_seconds = None
+if sys.argv[2] == '1':
+    import ai_module
+    start = time.perf_counter()
+    ai_module.warm_up()
+    warm_up_seconds = time.perf_counter() - start
+print(json.dumps({'import_seconds': import_seconds, 'warm_up_seconds': warm_up_seconds}))
+"""
+
+
+def measure_import(module, warm=False, repeat=3):
+    """
+    Измеряет время холодного импорта модуля в отдельном процессе Python.
+
+    Args:
+        module (str): Имя модуля.
+        warm (bool): Дополнительно измерить время прогрева бэкендов моделей.
+        repeat (int): Число повторов; возвращается лучший результат.
+
+    Returns:
+        dict: Время импорта и прогрева в секундах.
+    """
+    project_dir = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, TIMESEER_WARM_UP='0')
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', _MEASURE_CODE, module, '1' if warm else '0'],
+                                cwd=project_dir, env=env, capture_output=True, text=True, check=True)
+        runs.append(json.loads(output.stdout.strip().splitlines()[-1]))
+    return min(runs, key=lambda run: run['import_seconds'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Измерение времени запуска модулей TimeSeer")
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES, help="Модули для измерения")
+    parser.add_argument('--repeat', type=int, default=3, help="Число повторов (берётся лучший результат)")
+    parser.add_argument('--warm-up', action='store_true', help="Измерить также время прогрева бэкендов")
+    parser.add_argument('--max-seconds', type=float, default=None,
+                        help="Порог времени импорта; при превышении код возврата 1")
+    args = parser.parse_args()
+
+    report = {module: measure_import(module, args.warm_up, args.repeat) for module in args.modules}
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    if args.max_seconds is not None:
+        slow = [module for module, result in report.items() if result['import_seconds'] > args.max_seconds]
+        if slow:
+            print(f"Превышено время запуска ({args.max_seconds} с): {slow}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
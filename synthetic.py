@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+
+
+def make_synthetic_series(length=120, season_length=12, trend=0.05, amplitude=10.0, noise=1.0, level=100.0,
+                          freq='MS', start='2000-01-01', seed=0, name='emissions'):
+    """
+    Генерация синтетического временного ряда: уровень, линейный тренд, сезонность и шум.
+
+    Args:
+        length (int): Число наблюдений.
+        season_length (int): Длина сезона в наблюдениях.
+        trend (float): Прирост уровня за одно наблюдение.
+        amplitude (float): Амплитуда сезонной составляющей.
+        noise (float): Стандартное отклонение шума.
+        level (float): Начальный уровень.
+        freq (str): Частота индекса дат.
+        start (str): Первая дата.
+        seed (int): Зерно генератора случайных чисел.
+        name (str): Имя ряда.
+
+    Returns:
+        pd.Series: Временной ряд с индексом дат.
+    """
+    rng = np.random.default_rng(seed)
+    steps = np.arange(length)
+    values = (level + trend * steps + amplitude * np.sin(2 * np.pi * steps / season_length)
+              + rng.normal(0.0, noise, length))
+    index = pd.date_range(start=start, periods=length, freq=freq)
+    return pd.Series(values, index=index, name=name)
+
+
+# Имена столбцов синтетических таблиц (дальше - indicator_4, indicator_5, ...)
+SYNTHETIC_COLUMNS = ['emissions', 'costs', 'productivity']
+
+
+def make_synthetic_frame(length=120, season_length=12, columns=3, freq='MS', start='2000-01-01', seed=0):
+    """
+    Генерация таблицы из нескольких синтетических рядов с общим индексом дат.
+
+    Ряды отличаются уровнем, трендом и амплитудой сезонности.
+
+    Args:
+        length (int): Число наблюдений.
+        season_length (int): Длина сезона в наблюдениях.
+        columns (int): Число столбцов.
+        freq (str): Частота индекса дат.
+        start (str): Первая дата.
+        seed (int): Зерно генератора случайных чисел.
+
+    Returns:
+        pd.DataFrame: Таблица с индексом дат date.
+    """
+    rng = np.random.default_rng(seed)
+    frame = {}
+    for i in range(columns):
+        name = SYNTHETIC_COLUMNS[i] if i < len(SYNTHETIC_COLUMNS) else f"indicator_{i + 1}"
+        frame[name] = make_synthetic_series(length, season_length, trend=rng.uniform(-0.1, 0.1),
+                                            amplitude=rng.uniform(1.0, 20.0), level=rng.uniform(10.0, 200.0),
+                                            freq=freq, start=start, seed=seed * 1000 + i, name=name)
+    data = pd.DataFrame(frame)
+    data.index.name = 'date'
+    return data
+
+
+def write_synthetic_csv(path, length=120, season_length=12, columns=3, freq='MS', seed=0):
+    """
+    Сохраняет синтетическую таблицу в CSV в формате загрузки приложения (столбец date и столбцы показателей).
+
+    Returns:
+        str: Путь к файлу.
+    """
+    make_synthetic_frame(length, season_length, columns, freq, seed=seed).to_csv(path)
+    return path
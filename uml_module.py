@@ -1,46 +1,53 @@
 import os
+import hashlib
 import subprocess
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+import threading
+from matplotlib.figure import Figure
 import numpy as np
 
-def update_forecast_plot(forecast):
+
+def build_forecast_plot_figure(forecast):
+    """
+    Построение графика прогноза по шагам без использования глобального состояния pyplot.
+
+    Args:
+        forecast (np.ndarray): Прогноз.
+
+    Returns:
+        Figure: Фигура matplotlib.
+    """
+    fig = Figure(figsize=(8, 6))
+    ax = fig.subplots()
+    ax.plot(forecast, label='Прогноз')
+    ax.set_title('График прогноза')
+    ax.set_xlabel('Шаги')
+    ax.set_ylabel('Значение')
+    ax.legend()
+    ax.grid()
+    return fig
+
+
+def update_forecast_plot(forecast,
+                         output_path='C:\\Users\\User\\Desktop\\МИЭМ\\ВКР\\VKR\\venv\\Scripts\\Static\\forecast_plot.png'):
     """
     Создание графика прогноза.
 
     Args:
         forecast (np.ndarray): Прогноз.
+        output_path (str): Путь к выходному PNG-файлу.
 
     Returns:
         str: Путь к сгенерированному файлу графика.
     """
     try:
-        plt.figure(figsize=(8, 6))
-        plt.plot(forecast, label='Прогноз')
-        plt.title('График прогноза')
-        plt.xlabel('Шаги')
-        plt.ylabel('Значение')
-        plt.legend()
-        plt.grid()
-        output_path = 'C:\\Users\\User\\Desktop\\МИЭМ\\ВКР\\VKR\\venv\\Scripts\\Static\\forecast_plot.png'
-        plt.savefig(output_path)
-        plt.close()
+        build_forecast_plot_figure(forecast).savefig(output_path)
         return output_path
     except Exception as e:
         print(f"Ошибка в генерации графика прогноза: {str(e)}")
         return None
 
-def update_uml_diagram():
-    """
-    Генерация вертикальной UML-диаграммы для отделов компании с использованием PlantUML.
-
-    Returns:
-        str: Путь к сгенерированному файлу UML-диаграммы.
-    """
-    try:
-        # Описание UML-диаграммы в формате PlantUML
-        uml_code = """
+# Описание UML-диаграммы в формате PlantUML
+UML_SOURCE = """
         @startuml
         skinparam monochrome true
         skinparam packageStyle rectangle
@@ -134,29 +141,152 @@ def update_uml_diagram():
         @enduml
         """
 
-        # Сохранение UML-кода в файл
-        uml_file_path = 'C:\\Users\\User\\Desktop\\МИЭМ\\ВКР\\VKR\\uml_diagram.puml'
-        with open(uml_file_path, 'w', encoding='utf-8') as f:
-            f.write(uml_code)
+# Путь к файлу с исходным кодом диаграммы
+UML_FILE_PATH = 'C:\\Users\\User\\Desktop\\МИЭМ\\ВКР\\VKR\\uml_diagram.puml'
+# Путь к plantuml.jar
+PLANTUML_JAR_PATH = 'C:\\Users\\User\\Desktop\\МИЭМ\\ВКР\\VKR\\plantuml-1.2025.2.jar'
+# Путь к выходному файлу
+UML_OUTPUT_PATH = 'C:\\Users\\User\\Desktop\\МИЭМ\\ВКР\\VKR\\venv\\Scripts\\Static\\uml_diagram.png'
+# Использовать долгоживущий процесс PlantUML в режиме -pipe вместо запуска java на каждую отрисовку
+PLANTUML_PIPE_MODE = os.environ.get('TIMESEER_PLANTUML_PIPE', '0') == '1'
+
+# Разделитель, который PlantUML выводит после каждой диаграммы в режиме -pipe
+PIPE_DELIMITER = b'___TIMESEER_PLANTUML_END___'
+
+
+def source_hash(source):
+    """
+    Вычисляет хэш исходного кода диаграммы.
+
+    Args:
+        source (str): Исходный код диаграммы в формате PlantUML.
+
+    Returns:
+        str: Шестнадцатеричный SHA-256 хэш.
+    """
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+class PlantUMLRenderer:
+    """
+    Долгоживущий процесс PlantUML в режиме -pipe.
+
+    JVM запускается один раз, после чего каждая диаграмма отрисовывается без затрат на старт Java.
+    """
+
+    def __init__(self, jar_path=PLANTUML_JAR_PATH):
+        self.jar_path = jar_path
+        self._process = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        self._process = subprocess.Popen(
+            ['java', '-Djava.awt.headless=true', '-jar', self.jar_path,
+             '-pipe', '-tpng', '-charset', 'UTF-8', '-pipedelimitor', PIPE_DELIMITER.decode('ascii')],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    def render(self, source):
+        """
+        Отрисовывает диаграмму в PNG.
+
+        Args:
+            source (str): Исходный код диаграммы.
+
+        Returns:
+            bytes: Содержимое PNG-файла.
+        """
+        with self._lock:
+            if self._process is None or self._process.poll() is not None:
+                self._start()
+            try:
+                self._process.stdin.write(source.strip().encode('utf-8') + b'\n')
+                self._process.stdin.flush()
+                buffer = b''
+                while PIPE_DELIMITER not in buffer:
+                    chunk = os.read(self._process.stdout.fileno(), 65536)
+                    if not chunk:
+                        raise RuntimeError("Процесс PlantUML завершился во время отрисовки")
+                    buffer += chunk
+            except Exception:
+                self.close()
+                raise
+            return buffer[:buffer.index(PIPE_DELIMITER)].rstrip(b'\r\n')
+
+    def close(self):
+        """
+        Завершает процесс PlantUML.
+        """
+        if self._process is not None:
+            self._process.kill()
+            self._process.wait()
+            self._process = None
+
+
+_renderer = None
+
+
+def get_plantuml_renderer():
+    """
+    Возвращает общий долгоживущий процесс PlantUML, запуская его при первом вызове.
+    """
+    global _renderer
+    if _renderer is None:
+        _renderer = PlantUMLRenderer()
+    return _renderer
+
+
+def update_uml_diagram(source=UML_SOURCE, output_path=UML_OUTPUT_PATH, renderer=None):
+    """
+    Генерация вертикальной UML-диаграммы для отделов компании с использованием PlantUML.
+
+    Готовый PNG кэшируется по хэшу исходного кода диаграммы: PlantUML запускается,
+    только если исходный код изменился или файла ещё нет.
+
+    Args:
+        source (str): Исходный код диаграммы в формате PlantUML.
+        output_path (str): Путь к выходному PNG-файлу.
+        renderer (PlantUMLRenderer): Долгоживущий процесс PlantUML. Если не задан, используется
+            общий процесс при TIMESEER_PLANTUML_PIPE=1, иначе java запускается однократно.
+
+    Returns:
+        str: Путь к сгенерированному файлу UML-диаграммы.
+    """
+    try:
+        digest = source_hash(source)
+        hash_path = f"{output_path}.sha256"
+        if os.path.exists(output_path) and os.path.exists(hash_path):
+            with open(hash_path, 'r', encoding='utf-8') as f:
+                if f.read().strip() == digest:
+                    return output_path
 
-        # Путь к plantuml.jar
-        plantuml_jar_path = 'C:\\Users\\User\\Desktop\\МИЭМ\\ВКР\\VKR\\plantuml-1.2025.2.jar'
+        if renderer is None and PLANTUML_PIPE_MODE:
+            renderer = get_plantuml_renderer()
 
-        # Путь к выходному файлу
-        output_path = 'C:\\Users\\User\\Desktop\\МИЭМ\\ВКР\\VKR\\venv\\Scripts\\Static\\uml_diagram.png'
+        if renderer is not None:
+            png = renderer.render(source)
+            tmp_path = f"{output_path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(png)
+            os.replace(tmp_path, output_path)
+        else:
+            # Сохранение UML-кода в файл
+            with open(UML_FILE_PATH, 'w', encoding='utf-8') as f:
+                f.write(source)
 
-        # Вызов PlantUML для генерации диаграммы
-        subprocess.run([
-            'java', '-jar', plantuml_jar_path,
-            uml_file_path, '-o', os.path.dirname(output_path),
-            '-tpng'
-        ], check=True)
+            # Вызов PlantUML для генерации диаграммы
+            subprocess.run([
+                'java', '-jar', PLANTUML_JAR_PATH,
+                UML_FILE_PATH, '-o', os.path.dirname(output_path),
+                '-tpng'
+            ], check=True)
 
         # Проверяем, что файл создан
         if not os.path.exists(output_path):
             print("Файл UML-диаграммы не был создан")
             return None
 
+        with open(hash_path, 'w', encoding='utf-8') as f:
+            f.write(digest)
         return output_path
     except Exception as e:
         print(f"Ошибка в генерации UML-диаграммы: {str(e)}")
@@ -1,36 +1,112 @@
-import matplotlib
+import io
 
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+import numpy as np
 import pandas as pd
 
+from frequency import infer_frequency
 
-def plot_forecast(dates, historical_data, forecasts, column, model_names=None):
+# Форматы, в которых графики отдаются клиенту
+CHART_FORMATS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+
+def format_dates(dates):
+    """
+    Даты в формате ISO: только дата для дневных и более редких рядов, дата и время - для внутридневных.
+
+    Returns:
+        pd.Index: Строки дат.
+    """
+    dates = pd.DatetimeIndex(dates)
+    if (dates == dates.normalize()).all():
+        return dates.strftime('%Y-%m-%d')
+    return dates.strftime('%Y-%m-%d %H:%M')
+
+
+def build_forecast_figure(dates, historical_data, forecasts, column, model_names=None, forecast_dates=None):
     """
     Построение графика с историческими данными и прогнозами.
 
+    Используется объектный API matplotlib (Figure) без глобального состояния pyplot,
+    поэтому графики можно строить одновременно в нескольких потоках.
+
     Args:
         dates (pd.DatetimeIndex): Даты исторических данных.
         historical_data (np.ndarray): Исторические данные.
         forecasts (list): Список прогнозов от разных моделей.
         column (str): Название столбца (для подписи графика).
         model_names (list): Список названий моделей.
+        forecast_dates (pd.DatetimeIndex): Даты прогноза (по умолчанию - шаги частоты ряда после последней даты).
+
+    Returns:
+        Figure: Фигура matplotlib.
     """
-    plt.figure(figsize=(12, 6))
-    plt.plot(dates, historical_data, label='Исторические данные', color='blue')
+    fig = Figure(figsize=(12, 6))
+    ax = fig.subplots()
+    ax.plot(dates, historical_data, label='Исторические данные', color='blue')
 
-    forecast_dates = pd.date_range(start=dates[-1], periods=len(forecasts[0]) + 1, freq='MS')[1:]
+    if forecast_dates is None:
+        freq = infer_frequency(pd.DatetimeIndex(dates))
+        forecast_dates = pd.date_range(start=dates[-1], periods=len(forecasts[0]) + 1, freq=freq)[1:]
     colors = ['red', 'green', 'purple']
     for i, (forecast, model_name) in enumerate(zip(forecasts, model_names)):
-        plt.plot(forecast_dates, forecast, label=f'Прогноз {model_name}', color=colors[i % len(colors)])
+        ax.plot(forecast_dates, forecast, label=f'Прогноз {model_name}', color=colors[i % len(colors)])
+
+    ax.set_title(f'Прогноз {column}')
+    ax.set_xlabel('Дата')
+    ax.set_ylabel(column)
+    ax.legend()
+    ax.grid()
+    return fig
+
+
+def render_figure(fig, fmt='png'):
+    """
+    Отрисовка фигуры в байты.
+
+    Args:
+        fig (Figure): Фигура matplotlib.
+        fmt (str): Формат изображения ('png' или 'svg').
 
-    plt.title(f'Прогноз {column}')
-    plt.xlabel('Дата')
-    plt.ylabel(column)
-    plt.legend()
-    plt.grid()
-    plt.savefig('C:\\Users\\User\\Desktop\\МИЭМ\\ВКР\\VKR\\venv\\Scripts\\Static\\forecast.png')
-    plt.close()
+    Returns:
+        bytes: Содержимое изображения.
+    """
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt)
+    return buffer.getvalue()
+
+
+def forecast_series(dates, historical_data, forecasts, model_names, forecast_dates):
+    """
+    Данные графика прогноза в виде рядов для построения графика на стороне клиента.
+
+    Returns:
+        dict: Исторический ряд и прогнозы моделей (даты в формате ISO).
+    """
+    forecast_dates = format_dates(forecast_dates).tolist()
+    return {
+        'history': {'dates': format_dates(dates).tolist(),
+                    'values': np.asarray(historical_data, dtype=float).tolist()},
+        'forecasts': [{'model': model_name, 'dates': forecast_dates,
+                       'values': np.asarray(forecast, dtype=float).tolist()}
+                      for forecast, model_name in zip(forecasts, model_names)],
+    }
+
+
+def plot_forecast(dates, historical_data, forecasts, column, model_names=None,
+                  output_path='C:\\Users\\User\\Desktop\\МИЭМ\\ВКР\\VKR\\venv\\Scripts\\Static\\forecast.png'):
+    """
+    Построение графика с историческими данными и прогнозами и сохранение его в файл.
+
+    Args:
+        dates (pd.DatetimeIndex): Даты исторических данных.
+        historical_data (np.ndarray): Исторические данные.
+        forecasts (list): Список прогнозов от разных моделей.
+        column (str): Название столбца (для подписи графика).
+        model_names (list): Список названий моделей.
+        output_path (str): Путь к выходному PNG-файлу.
+    """
+    build_forecast_figure(dates, historical_data, forecasts, column, model_names).savefig(output_path)
 
 
 def create_metrics_table(dates, data, anomalies, clusters):
@@ -53,3 +129,68 @@ def create_metrics_table(dates, data, anomalies, clusters):
         'Кластер': clusters
     })
     return df
+
+
+def forecast_columns(forecast_dates, forecasts, model_names):
+    """
+    Прогнозы всех моделей в столбцовом виде (строка на пару дата-модель).
+
+    Строится векторно, без словаря на каждую точку прогноза.
+
+    Args:
+        forecast_dates (pd.DatetimeIndex): Даты прогноза.
+        forecasts (list): Список прогнозов от разных моделей.
+        model_names (list): Список названий моделей.
+
+    Returns:
+        dict: Столбцы 'date', 'value', 'model'.
+    """
+    dates = format_dates(forecast_dates).to_numpy()
+    return {
+        'date': np.tile(dates, len(forecasts)).tolist(),
+        'value': np.concatenate([np.asarray(f, dtype=float) for f in forecasts]).tolist(),
+        'model': np.repeat(np.asarray(model_names, dtype=object), len(dates)).tolist(),
+    }
+
+
+def history_page(dates, data, anomalies, clusters, page=1, page_size=100):
+    """
+    Страница таблицы исторических данных с метками аномалий и кластеров.
+
+    Args:
+        dates (pd.DatetimeIndex): Даты.
+        data (np.ndarray): Данные.
+        anomalies (np.ndarray): Метки аномалий.
+        clusters (np.ndarray): Метки кластеров.
+        page (int): Номер страницы (с 1).
+        page_size (int): Число строк на странице.
+
+    Returns:
+        tuple: (pd.DataFrame со строками страницы, общее число страниц).
+    """
+    total_pages = max(1, -(-len(data) // page_size))
+    page = min(max(1, page), total_pages)
+    rows = slice((page - 1) * page_size, page * page_size)
+    table = create_metrics_table(dates[rows], data[rows],
+                                 anomalies[rows] if anomalies is not None else None,
+                                 clusters[rows] if clusters is not None else None)
+    return table, total_pages
+
+
+def to_arrow_ipc(columns):
+    """
+    Сериализация столбцов в формат Arrow IPC (поток). Требует установленного pyarrow.
+
+    Args:
+        columns (dict): Имя столбца -> массив значений.
+
+    Returns:
+        bytes: Содержимое потока Arrow IPC.
+    """
+    import pyarrow as pa
+
+    table = pa.table({name: pa.array(values) for name, values in columns.items()})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
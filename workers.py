@@ -0,0 +1,299 @@
+import os
+import time
+import signal
+import threading
+import multiprocessing
+from multiprocessing.connection import wait
+
+# Состояния задачи в ответе KillableWorkerPool.run
+OK = 'ok'
+ERROR = 'error'
+TIMEOUT = 'timeout'
+# Период проверки освободившихся мест пула, пока выполняются собственные задачи вызова
+_SLOT_POLL_SECONDS = 0.05
+
+
+def _worker_loop(conn):
+    """
+    Цикл рабочего процесса: получает (функция, аргументы), выполняет и отправляет результат.
+    """
+    # Процесс останавливается пулом; Ctrl+C, отправленный группе процессов сервера, игнорируется
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        fn, args = task
+        try:
+            result = (OK, fn(*args))
+        except Exception as e:
+            result = (ERROR, str(e))
+        try:
+            conn.send(result)
+        except Exception as e:
+            # Результат не сериализуется - сообщаем об ошибке вместо него
+            conn.send((ERROR, f"Не удалось передать результат: {str(e)}"))
+
+
+def default_context(preload=None):
+    """
+    Контекст multiprocessing для рабочих процессов пула.
+
+    Процессы запускаются через forkserver, если он доступен (POSIX): сервер процессов
+    запускается как новый однопоточный интерпретатор, и замена убитого процесса создаётся
+    fork из него, а не из многопоточного процесса сервера приложения, в котором другой
+    поток может держать блокировку (например, logging) в момент fork. На остальных
+    платформах используется контекст по умолчанию.
+
+    Args:
+        preload (list): Модули, которые сервер процессов импортирует один раз при запуске,
+            чтобы рабочие процессы получали их без повторного импорта.
+
+    Returns:
+        Контекст multiprocessing.
+    """
+    if 'forkserver' not in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context()
+    context = multiprocessing.get_context('forkserver')
+    # Главный модуль, как и при spawn, заново импортируется в каждом новом рабочем процессе
+    # (под именем __mp_main__), поэтому запускаемые скрипты защищены if __name__ == '__main__'
+    if preload:
+        context.set_forkserver_preload(list(preload))
+    return context
+
+
+def inherit_forkserver():
+    """
+    Позволяет процессу, созданному fork из процесса с запущенным forkserver (рабочему процессу
+    gunicorn), запускать рабочие процессы через сервер процессов родителя, а не свой.
+
+    multiprocessing проверяет, что сервер процессов жив, через os.waitpid, что возможно только
+    в процессе, который его запустил; в дочернем процессе проверка заменяется сигналом 0.
+    Если сервер родителя завершился, запускается собственный.
+    """
+    from multiprocessing import forkserver
+    server = forkserver._forkserver
+    pid = server._forkserver_pid
+    if pid is None:
+        return
+    start_own = server.ensure_running
+
+    def ensure_running():
+        try:
+            os.kill(pid, 0)
+            return
+        except OSError:
+            pass
+        with server._lock:
+            if server._forkserver_pid == pid:
+                os.close(server._forkserver_alive_fd)
+                server._forkserver_address = None
+                server._forkserver_alive_fd = None
+                server._forkserver_pid = None
+                del server.ensure_running
+        start_own()
+
+    server.ensure_running = ensure_running
+
+
+class _Worker:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_loop, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.affinity = None
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+
+class KillableWorkerPool:
+    """
+    Пул долгоживущих рабочих процессов, задачи которых можно прервать по сроку.
+
+    Каждая задача выполняется в отдельном процессе; процесс, не уложившийся в срок,
+    убивается и заменяется новым при следующем запросе, остальные процессы (и их кэши
+    в памяти) сохраняются между вызовами. Задача с тем же ключом по возможности
+    отдаётся процессу, который уже выполнял её, чтобы использовать его кэш и импорты.
+    Число одновременно выполняемых задач ограничено для всего пула (max_running), поэтому
+    параллельные запросы ждут свободного места, а не запускают новые процессы.
+    """
+
+    def __init__(self, max_idle=4, context=None, preload=None, max_running=None):
+        """
+        Args:
+            max_idle (int): Наибольшее число простаивающих процессов, которые сохраняются.
+            context: Контекст multiprocessing (по умолчанию см. default_context).
+            preload (list): Модули для предварительного импорта в сервере процессов forkserver.
+            max_running (int): Наибольшее число задач, одновременно выполняемых всеми вызовами
+                run и iter_run пула (по умолчанию без ограничения).
+        """
+        self.max_idle = max_idle
+        self.max_running = max_running
+        self._context = context or default_context(preload)
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_running) if max_running else None
+
+    def start(self):
+        """
+        Запускает сервер процессов forkserver (с импортом модулей preload) заранее,
+        чтобы первый запрос не ждал его запуска.
+
+        Под gunicorn вызывается один раз в главном процессе до запуска рабочих процессов;
+        рабочие процессы, созданные fork, подключаются к этому серверу через inherit_forkserver.
+        """
+        if self._context.get_start_method() == 'forkserver':
+            from multiprocessing import forkserver
+            forkserver.ensure_running()
+
+    def _acquire(self, affinity=None):
+        with self._lock:
+            self._idle = [worker for worker in self._idle if worker.process.is_alive()]
+            for index, worker in enumerate(self._idle):
+                if worker.affinity == affinity:
+                    return self._idle.pop(index)
+            if self._idle:
+                return self._idle.pop()
+        return _Worker(self._context)
+
+    def _release(self, worker):
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(worker)
+                return
+        worker.stop()
+
+    def run(self, tasks, timeouts):
+        """
+        Выполняет задачи параллельно, каждую в своём процессе, и ждёт их не дольше сроков.
+
+        Args:
+            tasks (dict): Ключ -> (функция, кортеж аргументов). Функция и аргументы должны сериализоваться pickle.
+            timeouts (dict): Ключ -> срок задачи в секундах от её запуска (None - без ограничения);
+                ожидание свободного места в пуле в срок не входит.
+
+        Returns:
+            dict: Ключ -> (состояние OK/ERROR/TIMEOUT, результат или текст ошибки).
+        """
+        results = {key: (status, value) for key, status, value in self.iter_run(tasks, timeouts)}
+        return {key: results[key] for key in tasks}
+
+    def _acquire_slot(self, timeout):
+        if self._slots is None:
+            return True
+        if timeout is None:
+            return self._slots.acquire()
+        return self._slots.acquire(timeout=timeout)
+
+    def _release_slot(self):
+        if self._slots is not None:
+            self._slots.release()
+
+    def iter_run(self, tasks, timeouts=None, max_running=None):
+        """
+        Выполняет задачи в отдельных процессах и выдаёт результаты по мере завершения задач.
+
+        Задачи можно передать итератором: следующая задача берётся из него после запуска
+        предыдущей, поэтому её подготовка (например, загрузка файла) идёт параллельно
+        с выполнением уже запущенных задач, а вперёд готовится не больше одной задачи.
+
+        Args:
+            tasks (dict): Ключ -> (функция, кортеж аргументов) или итератор пар (ключ, (функция, кортеж
+                аргументов)). Функция и аргументы должны сериализоваться pickle.
+            timeouts (dict): Ключ -> срок задачи в секундах от её запуска (None - без ограничения);
+                срок ищется при запуске задачи, так что итератор задач может дополнять словарь.
+            max_running (int): Наибольшее число одновременно выполняемых задач вызова (по умолчанию
+                ограничено только местами пула).
+
+        Yields:
+            tuple: (ключ, состояние OK/ERROR/TIMEOUT, результат или текст ошибки).
+        """
+        timeouts = {} if timeouts is None else timeouts
+        items = iter(tasks.items() if isinstance(tasks, dict) else tasks)
+        pending = next(items, None)
+        running = {}
+        deadlines = {}
+        try:
+            while pending is not None or running:
+                while pending is not None and (max_running is None or len(running) < max_running):
+                    # Пока выполняются свои задачи, место пула не ждём, а проверяем их результаты
+                    if not self._acquire_slot(None if not running else 0):
+                        break
+                    key, (fn, args) = pending
+                    try:
+                        worker = self._acquire(key)
+                        worker.affinity = key
+                        worker.conn.send((fn, args))
+                    except Exception as e:
+                        self._release_slot()
+                        pending = next(items, None)
+                        yield key, ERROR, str(e)
+                        continue
+                    running[key] = worker
+                    # Срок отсчитывается с момента, когда задача получила место в пуле
+                    if timeouts.get(key) is not None:
+                        deadlines[key] = time.monotonic() + timeouts[key]
+                    pending = next(items, None)
+                if not running:
+                    continue
+
+                now = time.monotonic()
+                expired = [key for key in running if key in deadlines and deadlines[key] <= now]
+                for key in expired:
+                    running.pop(key).kill()
+                    self._release_slot()
+                    yield key, TIMEOUT, None
+                if expired:
+                    continue
+
+                waits = [deadlines[key] - now for key in running if key in deadlines]
+                if pending is not None and self._slots is not None:
+                    # Место в пуле может освободиться другим вызовом
+                    waits.append(_SLOT_POLL_SECONDS)
+                timeout = max(0.0, min(waits)) if waits else None
+                ready = wait([worker.conn for worker in running.values()], timeout)
+                for key, worker in list(running.items()):
+                    if worker.conn not in ready:
+                        continue
+                    del running[key]
+                    self._release_slot()
+                    try:
+                        result = worker.conn.recv()
+                        self._release(worker)
+                    except (EOFError, OSError):
+                        # Процесс завершился аварийно (например, был убит системой)
+                        result = (ERROR, "Рабочий процесс завершился аварийно")
+                        worker.kill()
+                    yield (key,) + tuple(result)
+        finally:
+            # Генератор закрыт до завершения задач (например, клиент прервал потоковый ответ)
+            for worker in running.values():
+                worker.kill()
+                self._release_slot()
+
+    def shutdown(self):
+        """
+        Останавливает простаивающие процессы.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.stop()